@@ -0,0 +1,307 @@
+"""
+Benchmark offline da coleta, do parse e da renderização do roster.
+
+Não acessa a rede: os dados são sintéticos e os endpoints do FiveM são
+substituídos por um servidor HTTP local (latência e 403 configuráveis).
+Para cada etapa e tamanho de servidor mostra a vazão, as latências p50/p99 e
+o pico de memória (tracemalloc, medido numa execução separada).
+
+    python benchmark.py
+    python benchmark.py --sizes 32,2048 --iterations 50 --latency 0.02 --json bench.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import tracemalloc
+import logging
+from aiohttp import web
+
+import fivem_scraper
+from fivem_scraper import (NuxtPayloadExtractor, SCRAPE_CHUNK_SIZE, _players_from_nuxt, _parse_server_page,
+                           _parse_api_payload, get_fivem_players_api_async, get_fivem_players_async)
+from factions import DEFAULT_CLASSIFIER, DEFAULT_RULES
+from http_client import http_client
+from registry import RegistryIndex
+from player_model import PlayerSnapshot
+from roster import build_roster_embeds, pack_embeds, group_players, render_roster
+from upstream import upstream_health
+
+DEFAULT_SIZES = (32, 128, 512, 2048)
+SERVER_ID = "bench1"
+
+
+# Dados sintéticos
+
+def make_players(count, seed=0):
+    """Jogadores no formato da API do FiveM"""
+    rng = random.Random(seed)
+    factions = [name for name, _, _ in DEFAULT_RULES]
+    players = []
+    for i in range(count):
+        tag = f"[{rng.choice(factions).upper()}] " if rng.random() < 0.4 else ""
+        players.append({
+            "endpoint": "127.0.0.1",
+            "id": i + 1,
+            "identifiers": [
+                f"license:{rng.getrandbits(160):040x}",
+                f"steam:{0x110000100000000 + i:x}",
+                f"discord:{rng.getrandbits(60)}",
+            ],
+            "name": f"{tag}Jogador {i} {rng.choice(['Silva', 'Souza', 'Lima', 'Costa'])}",
+            "ping": rng.randint(10, 250),
+        })
+    return players
+
+
+def make_registry(players, fraction=0.5, seed=0):
+    """Índice com parte dos jogadores (PlayerSnapshot) registrados, metade deles com facção"""
+    rng = random.Random(seed)
+    factions = [name for name, _, _ in DEFAULT_RULES]
+    index = RegistryIndex()
+    rows = [
+        {"steam_id": p.steam_id, "nickname": f"Registrado {p.id}",
+         "group": rng.choice(factions) if rng.random() < 0.5 else None}
+        for p in players if rng.random() < fraction
+    ]
+    index.put_many(rows)
+    return index
+
+
+def make_api_body(players):
+    return json.dumps({"EndPoint": SERVER_ID, "Data": {
+        "hostname": "Servidor de Benchmark", "svMaxclients": max(len(players), 64),
+        "players": players, "resources": [f"resource_{i}" for i in range(300)],
+    }}).encode("utf-8")
+
+
+def make_server_page(players):
+    """Página de detalhes com o payload do Nuxt no meio de HTML de enchimento"""
+    nuxt = json.dumps({"state": {"serverData": {"hostname": "Servidor de Benchmark", "players": players}}})
+    filler = "<div class=\"card\"><span>lorem ipsum</span></div>\n" * 2000
+    return (
+        "<!DOCTYPE html><html><head><title>Servidor de Benchmark</title></head><body>\n"
+        f"{filler}<script>window.nuxt={nuxt};</script>\n{filler}</body></html>"
+    ).encode("utf-8")
+
+
+# Servidor local no lugar do fivem.net
+
+class StubServer:
+    """Servidor HTTP local com a API e a página de detalhes do FiveM"""
+
+    def __init__(self, players, latency=0.0, forbidden=False):
+        self.latency = latency
+        self.forbidden = forbidden
+        self.api_body = make_api_body(players)
+        self.page_body = make_server_page(players)
+        self._runner = None
+        self.base_url = None
+
+    async def _respond(self, body, content_type):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.forbidden:
+            return web.Response(status=403, text="Forbidden")
+        return web.Response(body=body, content_type=content_type)
+
+    async def api(self, request):
+        return await self._respond(self.api_body, "application/json")
+
+    async def page(self, request):
+        return await self._respond(self.page_body, "text/html")
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/api/servers/single/{server_id}", self.api)
+        app.router.add_get("/servers/detail/{server_id}", self.page)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._runner.cleanup()
+
+
+def _point_scraper_at(base_url):
+    """Redirecionar os coletores para o servidor local, sem limite de taxa nem circuitos abertos"""
+    fivem_scraper.API_ENDPOINTS = [base_url + "/api/servers/single/{server_id}"]
+    fivem_scraper.SERVER_PAGE_URL = base_url + "/servers/detail/{server_id}"
+    upstream_health.rate = upstream_health.burst = 1e9
+    upstream_health._breakers.clear()
+    upstream_health._buckets.clear()
+
+
+# Medição
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def _report(stage, size, samples, peak):
+    total = sum(samples)
+    return {
+        "stage": stage,
+        "players": size,
+        "iterations": len(samples),
+        "ops_per_s": len(samples) / total if total else float("inf"),
+        "players_per_s": size * len(samples) / total if total else float("inf"),
+        "p50_ms": 1000 * _percentile(samples, 0.50),
+        "p99_ms": 1000 * _percentile(samples, 0.99),
+        "peak_kib": peak / 1024,
+    }
+
+
+def measure(stage, size, fn, iterations):
+    """Executar `fn` (síncrona) `iterations` vezes e medir; o pico de memória vem de uma execução extra"""
+    fn()  # aquecimento
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return _report(stage, size, samples, peak)
+
+
+async def measure_async(stage, size, fn, iterations):
+    """Mesmo que `measure`, para corrotinas"""
+    await fn()
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    await fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return _report(stage, size, samples, peak)
+
+
+# Etapas
+
+def bench_parsing(size, iterations):
+    players = make_players(size)
+    page = make_server_page(players).decode("utf-8")
+    api_body = make_api_body(players)
+
+    def stream_extract():
+        extractor = NuxtPayloadExtractor()
+        for start in range(0, len(page), SCRAPE_CHUNK_SIZE):
+            if extractor.feed(page[start:start + SCRAPE_CHUNK_SIZE]):
+                break
+        assert len(_players_from_nuxt(extractor.payload)) == size
+
+    def soup_fallback():
+        assert len(_parse_server_page(page, SERVER_ID)["players"]) == size
+
+    def api_parse():
+        assert len(_parse_api_payload(json.loads(api_body), SERVER_ID)["players"]) == size
+
+    return [
+        measure("html_stream_extract", size, stream_extract, iterations),
+        measure("html_soup_fallback", size, soup_fallback, max(3, iterations // 10)),
+        measure("api_json_parse", size, api_parse, iterations),
+    ]
+
+
+def bench_roster(size, iterations):
+    raw_players = make_players(size)
+    players = PlayerSnapshot.from_payload(raw_players)
+    registry = make_registry(players)
+
+    def normalize():
+        PlayerSnapshot.from_payload(raw_players)
+
+    def grouping():
+        group_players(players, registry, DEFAULT_CLASSIFIER)
+
+    def render():
+        pack_embeds(build_roster_embeds("Servidor de Benchmark", players, size, registry, DEFAULT_CLASSIFIER))
+
+    data = {"hostname": "Servidor de Benchmark", "players": players, "max_players": size, "version": 1}
+
+    def cached_render():
+        render_roster(SERVER_ID, data, registry, DEFAULT_CLASSIFIER, 0)
+
+    return [
+        measure("player_normalize", size, normalize, iterations),
+        measure("registry_join_grouping", size, grouping, iterations),
+        measure("roster_render_pack", size, render, iterations),
+        measure("roster_cache_hit", size, cached_render, iterations),
+    ]
+
+
+async def bench_stub(size, iterations, latency):
+    players = make_players(size)
+    results = []
+    try:
+        async with StubServer(players, latency=latency) as stub:
+            _point_scraper_at(stub.base_url)
+
+            async def api():
+                assert (await get_fivem_players_api_async(SERVER_ID))["success"]
+
+            async def scrape():
+                assert (await get_fivem_players_async(SERVER_ID))["success"]
+
+            results.append(await measure_async("stub_api_fetch", size, api, iterations))
+            results.append(await measure_async("stub_scrape_fetch", size, scrape, iterations))
+
+        async with StubServer(players, latency=latency, forbidden=True) as stub:
+            _point_scraper_at(stub.base_url)
+
+            async def blocked():
+                assert not (await get_fivem_players_api_async(SERVER_ID))["success"]
+
+            # As primeiras respostas 403 abrem o circuito; o resto mede a falha imediata
+            results.append(await measure_async("stub_api_403", size, blocked, iterations))
+    finally:
+        await http_client.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="quantidades de jogadores, separadas por vírgula")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--latency", type=float, default=0.0, help="latência (s) do servidor local")
+    parser.add_argument("--skip-http", action="store_true", help="não medir as etapas com o servidor local")
+    parser.add_argument("--json", help="gravar os resultados neste arquivo")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+
+    results = []
+    for size in sizes:
+        results += bench_parsing(size, args.iterations)
+        results += bench_roster(size, args.iterations)
+        if not args.skip_http:
+            results += asyncio.run(bench_stub(size, args.iterations, args.latency))
+
+    print(f"{'etapa':<24}{'players':>8}{'ops/s':>10}{'players/s':>12}{'p50 ms':>9}{'p99 ms':>9}{'pico KiB':>10}")
+    for row in results:
+        print(f"{row['stage']:<24}{row['players']:>8}{row['ops_per_s']:>10.1f}{row['players_per_s']:>12.0f}"
+              f"{row['p50_ms']:>9.2f}{row['p99_ms']:>9.2f}{row['peak_kib']:>10.0f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,36 @@
 import discord
-import requests
+import aiohttp
+import asyncio
 import os
 import logging
-from fivem_scraper import get_fivem_players, get_fivem_players_api
+from snapshot_cache import snapshot_cache
+from poller import poller
+from registry import registry, get_player, save_player, parse_player_rows, bulk_upsert_players, export_players
+from player_search import search_players
+from data_access import data_access
+import io
+import watchlist
+from factions import faction_rules, parse_color, DEFAULT_CLASSIFIER, FALLBACK_FACTION
+from roster import render_roster, roster_cache
+from snapshot_diff import snapshot_differ
+from notifications import notification_store, format_events
+from livestatus import livestatus_store, livestatus_updater
+from history import history_recorder, peak_hours, time_played
+from shared_store import shared_store
+from http_client import http_client
+from upstream import upstream_health
+import math
+import metrics
+import startup_profile
+from metrics import STAGE_SECONDS
+from commands import CommandRouter, COMMAND_USER_RATE, COMMAND_USER_PER, COMMAND_GUILD_RATE, COMMAND_GUILD_PER
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
+# "1": AutoShardedClient (o Discord informa quantos shards usar); "0": um único Client
+BOT_SHARDED = os.environ.get("BOT_SHARDED", "1") != "0"
+
 # Initialize Discord bot with intents
 def run_discord_bot():
     # Token fixo para o bot Discord - Nunca vai mudar
@@ -19,8 +43,61 @@ def run_discord_bot():
     intents.message_content = False  # Disable message content intent due to privileged requirements
     
     # Create a regular client instead of commands.Bot
-    client = discord.Client(intents=intents)
-    logger.info("Using Discord Client with message handling instead of commands framework")
+    # O AutoShardedClient usa a quantidade de shards recomendada pelo Discord (1 para poucas guilds)
+    client_class = discord.AutoShardedClient if BOT_SHARDED else discord.Client
+    client = client_class(intents=intents)
+    logger.info(f"Using Discord {client_class.__name__} with message handling instead of commands framework")
+
+    # Cada snapshot novo é comparado com o anterior para gerar eventos de entrada/saída
+    snapshot_cache.add_listener(snapshot_differ.update)
+
+    async def notify_player_events(server_id, events, index):
+        """Avisar os canais inscritos sobre entradas, saídas e trocas de nome"""
+        channel_ids = notification_store.channels(server_id)
+        if not channel_ids:
+            return
+        snapshot = snapshot_cache.snapshot(server_id)
+        server_name = snapshot['hostname'] if snapshot else server_id
+        messages = format_events(server_name, events, registry)
+        for channel_id in list(channel_ids):
+            channel = client.get_channel(channel_id)
+            if channel is None:
+                continue
+            for text in messages:
+                try:
+                    await channel.send(text)
+                except discord.HTTPException as e:
+                    logger.warning(f"Erro ao enviar aviso para o canal {channel_id}: {str(e)}")
+                    break
+
+    snapshot_differ.subscribe(notify_player_events)
+
+    # Snapshots publicados para os processos web
+    snapshot_cache.add_listener(shared_store.on_snapshot)
+
+    # Histórico de sessões e população, gravado em lotes
+    snapshot_cache.add_listener(history_recorder.on_snapshot)
+    snapshot_differ.subscribe(history_recorder.on_events)
+
+    # Rosters ao vivo, editados a cada snapshot novo
+    snapshot_cache.add_listener(livestatus_updater.on_snapshot)
+
+    commands_synced = False
+    startup_reported = False
+
+    def bot_status():
+        """Estado publicado para o /api/status dos processos web"""
+        return {
+            "guilds": len(client.guilds),
+            "shards": client.shard_count or 1,
+            "snapshot_cache": snapshot_cache.stats(),
+            "roster_cache": roster_cache.stats(),
+            "livestatus": livestatus_updater.stats(),
+            "servers": poller.status(),
+            "bot_db_pool": data_access.stats(),
+            "http": http_client.stats(),
+            "upstream": upstream_health.status()
+        }
 
     @client.event
     async def on_ready():
@@ -29,389 +106,647 @@ def run_discord_bot():
         logger.info(f'Bot ID: {client.user.id}')
         logger.info(f'Bot is connected to {len(client.guilds)} servers')
         
+        # Manter os snapshots dos servidores atualizados em segundo plano,
+        # incluindo os servidores das listas de acompanhamento das guilds
+        try:
+            for watched_id in await data_access.run(watchlist.all_watched_server_ids):
+                poller.add_server(watched_id)
+            await data_access.run(notification_store.load)
+            for notified_id in notification_store.servers():
+                poller.add_server(notified_id)
+            await data_access.run(livestatus_store.load)
+            for live_id in livestatus_store.servers():
+                poller.add_server(live_id)
+        except Exception as db_error:
+            logger.warning(f"Erro ao carregar servidores acompanhados: {db_error}")
+        poller.start()
+        livestatus_updater.start(client)
+        history_recorder.start()
+        metrics.start_loop_monitor()
+        metrics.GATEWAY_LATENCY.fn = lambda: client.latency if math.isfinite(client.latency) else None
+        shared_store.start_status_publisher(bot_status, metrics.render)
+        
+        # Carregar o índice de jogadores registrados uma única vez, fora do event loop
+        if not registry.loaded:
+            try:
+                await data_access.run(registry.load)
+            except Exception as db_error:
+                logger.warning(f"Erro ao carregar jogadores registrados: {db_error}")
+        
+        # Registrar os slash commands no Discord (uma vez por processo)
+        nonlocal commands_synced
+        if not commands_synced:
+            try:
+                synced = await tree.sync()
+                commands_synced = True
+                logger.info(f"{len(synced)} slash commands sincronizados")
+            except discord.HTTPException as e:
+                logger.warning(f"Erro ao sincronizar slash commands: {str(e)}")
+        
         # Set bot activity status
         await client.change_presence(activity=discord.Activity(
             type=discord.ActivityType.watching, 
             name="FiveM servers | @mention players"
         ))
+        
+        nonlocal startup_reported
+        if not startup_reported:
+            startup_reported = True
+            startup_profile.mark("bot_ready")
+            startup_profile.report()
 
-    @client.event
-    async def on_message(message):
-        """Handle messages and respond to specific mentions"""
-        # Ignore messages from the bot itself to prevent loops
-        if message.author == client.user:
+    router = CommandRouter()
+    # Comandos que consultam o FiveM ou o banco: limite de execuções simultâneas e cooldown
+    expensive = dict(
+        user_cooldown=(COMMAND_USER_RATE, COMMAND_USER_PER),
+        guild_cooldown=(COMMAND_GUILD_RATE, COMMAND_GUILD_PER)
+    )
+
+    @router.command("help", "Mostra a ajuda do bot", aliases=("ajuda",))
+    async def help_command(ctx):
+        help_embed = discord.Embed(
+            title="Ajuda do Bot FiveM",
+            description="Este bot permite verificar informações de servidores FiveM.",
+            color=discord.Color.blue()
+        )
+
+        help_embed.add_field(
+            name="📋 Comandos Disponíveis",
+            value=f"• `@bot players [servidor]` - Mostra os jogadores de um servidor (padrão: {watchlist.DEFAULT_SERVER_ID})\n"
+                  "• `@bot overview` - Mostra a contagem de jogadores de todos os servidores acompanhados\n"
+                  "• `@bot watch add|remove servidor` / `@bot watch list` - Gerencia os servidores acompanhados\n"
+                  "• `@bot peak [servidor] [dias]` - Mostra os horários de pico do servidor\n"
+                  "• `@bot playtime steam:ID [dias]` - Mostra o tempo jogado por um jogador\n"
+                  "• `@bot notify [off] [servidor]` - Ativa/desativa avisos de entrada e saída de jogadores neste canal\n"
+                  "• `@bot livestatus [off] [servidor]` - Mantém neste canal um roster que se atualiza sozinho\n"
+                  "• `@bot faction add Nome #RRGGBB [palavras]` / `remove Nome` / `list` / `reset` - Configura as facções\n"
+                  "• `@bot register steam:ID NomeJogador - Grupo/Notas` - Registra ou atualiza informações de um jogador\n"
+                  "• `@bot player steam:ID` - Busca informações registradas de um jogador\n"
+                  "• `@bot search texto [página]` - Procura jogadores registrados por nickname, grupo ou notas\n"
+                  "• `@bot import` + anexo CSV/JSON - Registra jogadores em lote\n"
+                  "• `@bot export [json]` - Exporta os jogadores registrados\n"
+                  "• `@bot help` ou `@bot ajuda` - Mostra esta mensagem de ajuda",
+            inline=False
+        )
+
+        help_embed.add_field(
+            name="💡 Como usar",
+            value=f"Mencione o bot seguido do comando que deseja usar. Por exemplo:\n"
+                  f"`@{client.user.name} players`\n\n"
+                  f"Os comandos (exceto `import`) também existem como slash commands, ex.: `/players argumentos:byzd3d`.\n\n"
+                  f"Se você encontrar o erro 403, isso significa que a API do FiveM está limitando o acesso.",
+            inline=False
+        )
+
+        help_embed.add_field(
+            name="🌐 Links Úteis",
+            value="• [Lista de Servidores FiveM](https://servers.fivem.net/)\n"
+                  "• [Status da API FiveM](https://status.cfx.re/)",
+            inline=False
+        )
+
+        help_embed.set_footer(text=f"Bot criado por {ctx.guild.name if ctx.guild else 'FiveM Discord'}")
+
+        await ctx.reply(embed=help_embed)
+
+    @router.command("register", "Registra ou atualiza um jogador: steam:ID NomeJogador - Grupo/Notas")
+    async def register_command(ctx):
+        # Check for valid format
+        if " " not in ctx.text:
+            await ctx.reply("❌ Formato inválido. Use: `@bot register steam:ID NomeJogador - Grupo/Notas`")
             return
-            
-        # Check if the message mentions our bot
-        if client.user.mentioned_in(message):
-            # Check for help command
-            if "help" in message.content.lower() or "ajuda" in message.content.lower():
-                logger.info(f"Help command received from {message.author} in {message.guild}")
-                help_embed = discord.Embed(
-                    title="Ajuda do Bot FiveM",
-                    description="Este bot permite verificar informações de servidores FiveM.",
-                    color=discord.Color.blue()
+
+        # Extract Steam ID and name parts
+        parts = ctx.text.split(" ", 1)
+        steam_id = parts[0].strip()
+        player_data = parts[1].strip()
+
+        # Split name and notes/group
+        if "-" in player_data:
+            name_notes = player_data.split("-", 1)
+            nickname = name_notes[0].strip()
+            notes = name_notes[1].strip()
+            group = notes.split()[0] if notes else None
+        else:
+            nickname = player_data
+            notes = ""
+            group = None
+
+        try:
+            # Gravação roda no pool de threads do banco, fora do event loop
+            created = await data_access.run(save_player, steam_id, nickname, notes, group)
+            if created:
+                await ctx.reply(f"✅ Jogador registrado: `{nickname}` com ID `{steam_id}`")
+            else:
+                await ctx.reply(f"✅ Jogador atualizado: `{nickname}` com ID `{steam_id}`")
+        except Exception as e:
+            logger.error(f"Error registering player: {str(e)}")
+            await ctx.reply(f"❌ Erro ao registrar jogador: {str(e)}")
+
+    # Importação precisa de anexo; só existe como comando por menção
+    @router.command("import", "Registra jogadores em lote a partir de um anexo CSV/JSON",
+                    concurrency=1, user_cooldown=(1, 60), slash=False)
+    async def import_command(ctx):
+        if not ctx.guild or not ctx.author.guild_permissions.manage_guild:
+            await ctx.reply("❌ Só quem pode gerenciar o servidor do Discord pode importar jogadores.")
+            return
+        if not ctx.attachments:
+            await ctx.reply("❌ Anexe um arquivo CSV (steam_id,nickname,group,notes) ou JSON à mensagem.")
+            return
+
+        attachment = ctx.attachments[0]
+        try:
+            content = await attachment.read()
+            rows, errors = await asyncio.to_thread(parse_player_rows, content, attachment.filename)
+            imported = await data_access.run(bulk_upsert_players, rows)
+            reply = f"✅ {imported} jogadores importados"
+            if errors:
+                reply += f"\n⚠️ {len(errors)} linhas ignoradas:\n" + "\n".join(errors[:10])
+            await ctx.reply(reply[:2000])
+        except (ValueError, UnicodeDecodeError) as e:
+            await ctx.reply(f"❌ Arquivo inválido: {str(e)}")
+        except Exception as e:
+            logger.error(f"Error importing players: {str(e)}")
+            await ctx.reply(f"❌ Erro ao importar jogadores: {str(e)}")
+
+    @router.command("export", "Exporta os jogadores registrados (csv ou json)",
+                    concurrency=1, user_cooldown=(1, 60))
+    async def export_command(ctx):
+        # O arquivo tem todos os steam IDs e as notas dos moderadores
+        if not ctx.guild or not ctx.author.guild_permissions.manage_guild:
+            await ctx.reply("❌ Só quem pode gerenciar o servidor do Discord pode exportar jogadores.")
+            return
+        fmt = "json" if "json" in ctx.text.lower() else "csv"
+        try:
+            content = await data_access.run(lambda: "".join(export_players(fmt)))
+            await ctx.reply(file=discord.File(io.BytesIO(content.encode("utf-8")), filename=f"players.{fmt}"))
+        except Exception as e:
+            logger.error(f"Error exporting players: {str(e)}")
+            await ctx.reply(f"❌ Erro ao exportar jogadores: {str(e)}")
+
+    @router.command("player", "Busca informações registradas de um jogador: steam:ID")
+    async def player_command(ctx):
+        steam_id = ctx.text.strip()
+
+        try:
+            player = await data_access.run(get_player, steam_id)
+
+            if player:
+                embed = discord.Embed(
+                    title=f"Informações do Jogador: {player['nickname']}",
+                    color=discord.Color.green()
                 )
-                
-                help_embed.add_field(
-                    name="📋 Comandos Disponíveis",
-                    value="• `@bot players` - Mostra informações sobre os jogadores do servidor byzd3d\n"
-                          "• `@bot register steam:ID NomeJogador - Grupo/Notas` - Registra ou atualiza informações de um jogador\n"
-                          "• `@bot player steam:ID` - Busca informações registradas de um jogador\n"
-                          "• `@bot help` ou `@bot ajuda` - Mostra esta mensagem de ajuda",
-                    inline=False
+
+                embed.add_field(name="Steam ID", value=f"`{player['steam_id']}`", inline=False)
+
+                if player['group']:
+                    embed.add_field(name="Grupo", value=player['group'], inline=True)
+
+                if player['notes']:
+                    embed.add_field(name="Notas", value=player['notes'], inline=False)
+
+                embed.set_footer(text=f"Última atualização: {player['updated_at'].strftime('%d/%m/%Y %H:%M')}")
+
+                await ctx.reply(embed=embed)
+            else:
+                await ctx.reply(f"❌ Nenhum jogador encontrado com o ID `{steam_id}`")
+        except Exception as e:
+            logger.error(f"Error looking up player: {str(e)}")
+            await ctx.reply(f"❌ Erro ao buscar jogador: {str(e)}")
+
+    @router.command("search", "Procura jogadores registrados por nickname, grupo ou notas: texto [página]",
+                    aliases=("buscar",), concurrency=4, **expensive)
+    async def search_command(ctx):
+        args = ctx.args
+        page = 1
+        if len(args) > 1 and args[-1].isdigit():
+            page = max(1, int(args.pop()))
+        query = " ".join(args)
+        if not query:
+            await ctx.reply("❌ Formato inválido. Use: `@bot search texto [página]`")
+            return
+
+        try:
+            found = await data_access.run(search_players, query, page)
+        except Exception as e:
+            logger.error(f"Error searching players: {str(e)}")
+            await ctx.reply(f"❌ Erro ao buscar jogadores: {str(e)}")
+            return
+
+        if not found["results"]:
+            await ctx.reply(f"❌ Nenhum jogador encontrado para `{query}`" + (f" na página {page}" if page > 1 else ""))
+            return
+
+        embed = discord.Embed(title=f"🔎 Busca: {query}", color=discord.Color.blue())
+        lines = []
+        for player in found["results"]:
+            line = f"• **{player['nickname']}**" + (f" ({player['group']})" if player['group'] else "")
+            line += f" | `{player['steam_id']}`"
+            if player['notes']:
+                notes = player['notes'] if len(player['notes']) <= 60 else player['notes'][:59] + "…"
+                line += f"\n  {notes}"
+            lines.append(line)
+        embed.description = "\n".join(lines)[:4096]
+        footer = f"Página {page}"
+        if found["has_more"]:
+            footer += f" • próxima: @bot search {query} {page + 1}"
+        embed.set_footer(text=footer)
+        await ctx.reply(embed=embed)
+
+    @router.command("faction", "Configura as facções: add Nome #RRGGBB [palavras] / remove Nome / list / reset")
+    async def faction_command(ctx):
+        if not ctx.guild:
+            await ctx.reply("❌ As facções só podem ser configuradas dentro de um servidor do Discord.")
+            return
+
+        # Extract command parts
+        action, _, rest = ctx.text.lower().partition(" ")
+        rest = rest.strip()
+
+        try:
+            if action == "add":
+                # Nome da facção é tudo antes da cor; palavras-chave (separadas por vírgula) vêm depois
+                words = rest.split()
+                color_index = next((i for i, w in enumerate(words) if parse_color(w) is not None), None)
+                if not color_index:
+                    await ctx.reply("❌ Formato inválido. Use: `@bot faction add Nome #RRGGBB [palavra1, palavra2]`")
+                    return
+                name = " ".join(words[:color_index])
+                color = parse_color(words[color_index])
+                keywords = [k.strip() for k in " ".join(words[color_index + 1:]).split(",") if k.strip()] or [name]
+                if name == FALLBACK_FACTION:
+                    await ctx.reply(f"❌ `{FALLBACK_FACTION}` é a facção padrão e não pode ser configurada")
+                    return
+
+                created = await data_access.run(faction_rules.set_rule, ctx.guild.id, name, color, keywords)
+                verb = "criada" if created else "atualizada"
+                await ctx.reply(f"✅ Facção `{name}` {verb} (palavras-chave: {', '.join(keywords)})")
+
+            elif action == "remove":
+                removed = await data_access.run(faction_rules.remove_rule, ctx.guild.id, rest)
+                if removed:
+                    await ctx.reply(f"✅ Facção `{rest}` removida")
+                else:
+                    await ctx.reply(f"❌ Facção `{rest}` não encontrada")
+
+            elif action == "reset":
+                await data_access.run(faction_rules.reset, ctx.guild.id)
+                await ctx.reply("✅ Facções restauradas para o padrão")
+
+            else:
+                classifier = await data_access.run(faction_rules.classifier, ctx.guild.id)
+                lines = [
+                    f"• **{name}** `#{color:06X}` - {', '.join(keywords)}"
+                    for name, color, keywords in classifier.rules
+                    if name != FALLBACK_FACTION
+                ]
+                lines.append(f"• **{FALLBACK_FACTION}** - jogadores sem facção")
+                embed = discord.Embed(
+                    title="Facções",
+                    description="\n".join(lines),
+                    color=discord.Color.blue()
                 )
-                
-                help_embed.add_field(
-                    name="💡 Como usar",
-                    value=f"Mencione o bot seguido do comando que deseja usar. Por exemplo:\n"
-                          f"`@{client.user.name} players`\n\n"
-                          f"Se você encontrar o erro 403, isso significa que a API do FiveM está limitando o acesso.",
-                    inline=False
+                await ctx.reply(embed=embed)
+        except Exception as e:
+            logger.error(f"Error updating faction rules: {str(e)}")
+            await ctx.reply(f"❌ Erro ao configurar facções: {str(e)}")
+
+    @router.command("peak", "Mostra os horários de pico: [servidor] [dias]", concurrency=4, **expensive)
+    async def peak_command(ctx):
+        args = ctx.text.lower().split()
+        days = int(args.pop()) if args and args[-1].isdigit() else 7
+        server_id = watchlist.normalize_server_id(args[0]) if args else watchlist.DEFAULT_SERVER_ID
+        if not server_id:
+            await ctx.reply("❌ Formato inválido. Use: `@bot peak [IDdoServidor] [dias]`")
+            return
+
+        try:
+            hours = await data_access.run(peak_hours, server_id, days)
+            if not hours:
+                await ctx.reply(f"📊 Ainda não há histórico do servidor `{server_id}`")
+                return
+            lines = [
+                f"• **{hour:02d}:00** - média {average:.0f}, pico {peak} players"
+                for hour, average, peak in hours[:5]
+            ]
+            embed = discord.Embed(
+                title=f"Horários de pico - {server_id}",
+                description="\n".join(lines),
+                color=discord.Color.blue()
+            )
+            embed.set_footer(text=f"Últimos {days} dias (horário UTC)")
+            await ctx.reply(embed=embed)
+        except Exception as e:
+            logger.error(f"Error querying peak hours: {str(e)}")
+            await ctx.reply(f"❌ Erro ao consultar o histórico: {str(e)}")
+
+    @router.command("playtime", "Mostra o tempo jogado: steam:ID [dias]", concurrency=4, **expensive)
+    async def playtime_command(ctx):
+        args = ctx.args
+        if not args:
+            await ctx.reply("❌ Formato inválido. Use: `@bot playtime steam:ID [dias]`")
+            return
+        steam_id = args[0]
+        days = int(args[1]) if len(args) > 1 and args[1].isdigit() else None
+
+        try:
+            total, sessions = await data_access.run(time_played, steam_id, days)
+            hours, remainder = divmod(int(total.total_seconds()), 3600)
+            period = f"nos últimos {days} dias" if days else "no total"
+            registered = registry.get(steam_id)
+            name = registered[0] if registered else steam_id
+            await ctx.reply(f"⏱️ `{name}` jogou **{hours}h{remainder // 60:02d}min** {period} ({sessions} sessões)")
+        except Exception as e:
+            logger.error(f"Error querying playtime: {str(e)}")
+            await ctx.reply(f"❌ Erro ao consultar o histórico: {str(e)}")
+
+    @router.command("notify", "Ativa/desativa avisos de entrada e saída neste canal: [off] [servidor]")
+    async def notify_command(ctx):
+        if not ctx.guild:
+            await ctx.reply("❌ Os avisos só podem ser configurados dentro de um servidor do Discord.")
+            return
+
+        # Extract command parts
+        args = ctx.text.lower().split()
+        disable = bool(args) and args[0] == "off"
+        if disable:
+            args = args[1:]
+        server_id = watchlist.normalize_server_id(args[0]) if args else watchlist.DEFAULT_SERVER_ID
+        if not server_id:
+            await ctx.reply("❌ Formato inválido. Use: `@bot notify [off] [IDdoServidor]`")
+            return
+
+        try:
+            if disable:
+                removed = await data_access.run(notification_store.unsubscribe, ctx.channel.id, server_id)
+                if removed:
+                    await ctx.reply(f"🔕 Avisos do servidor `{server_id}` desativados neste canal")
+                else:
+                    await ctx.reply(f"❌ Este canal não recebe avisos do servidor `{server_id}`")
+            else:
+                added = await data_access.run(
+                    notification_store.subscribe, ctx.guild.id, ctx.channel.id, server_id
                 )
-                
-                help_embed.add_field(
-                    name="🌐 Links Úteis",
-                    value="• [Lista de Servidores FiveM](https://servers.fivem.net/)\n"
-                          "• [Status da API FiveM](https://status.cfx.re/)",
-                    inline=False
+                poller.add_server(server_id)
+                if added:
+                    await ctx.reply(f"🔔 Este canal vai receber avisos de entrada/saída do servidor `{server_id}`")
+                else:
+                    await ctx.reply(f"ℹ️ Este canal já recebe avisos do servidor `{server_id}`")
+        except Exception as e:
+            logger.error(f"Error updating notifications: {str(e)}")
+            await ctx.reply(f"❌ Erro ao configurar avisos: {str(e)}")
+
+    @router.command("livestatus", "Ativa/desativa neste canal um roster que se atualiza sozinho: [off] [servidor]")
+    async def livestatus_command(ctx):
+        if not ctx.guild:
+            await ctx.reply("❌ O roster ao vivo só pode ser configurado dentro de um servidor do Discord.")
+            return
+
+        # Extract command parts
+        args = ctx.text.lower().split()
+        disable = bool(args) and args[0] == "off"
+        if disable:
+            args = args[1:]
+        server_id = watchlist.normalize_server_id(args[0]) if args else watchlist.DEFAULT_SERVER_ID
+        if not server_id:
+            await ctx.reply("❌ Formato inválido. Use: `@bot livestatus [off] [IDdoServidor]`")
+            return
+
+        try:
+            if disable:
+                entry = await data_access.run(livestatus_store.unsubscribe, ctx.channel.id, server_id)
+                if entry is not None:
+                    await livestatus_updater.remove_messages(entry)
+                    await ctx.reply(f"⏹️ Roster ao vivo do servidor `{server_id}` desativado neste canal")
+                else:
+                    await ctx.reply(f"❌ Este canal não tem roster ao vivo do servidor `{server_id}`")
+            else:
+                added = await data_access.run(
+                    livestatus_store.subscribe, ctx.guild.id, ctx.channel.id, server_id
                 )
-                
-                help_embed.set_footer(text=f"Bot criado por {message.guild.name if message.guild else 'FiveM Discord'}")
-                
-                await message.reply(embed=help_embed)
-                return
-                
-            # Register player command
-            elif "register" in message.content.lower():
-                logger.info(f"Register command received from {message.author} in {message.guild}")
-                
-                # Extract command parts
-                content = message.content.split("register", 1)[1].strip()
-                
-                # Check for valid format
-                if " " not in content:
-                    await message.reply("❌ Formato inválido. Use: `@bot register steam:ID NomeJogador - Grupo/Notas`")
+                poller.add_server(server_id)
+                if added:
+                    livestatus_updater.mark_dirty(server_id)
+                    await ctx.reply(f"📺 O roster do servidor `{server_id}` vai ficar neste canal, atualizado a cada coleta")
+                else:
+                    await ctx.reply(f"ℹ️ Este canal já tem o roster ao vivo do servidor `{server_id}`")
+        except Exception as e:
+            logger.error(f"Error updating livestatus: {str(e)}")
+            await ctx.reply(f"❌ Erro ao configurar o roster ao vivo: {str(e)}")
+
+    @router.command("watch", "Gerencia os servidores acompanhados: add|remove servidor / list")
+    async def watch_command(ctx):
+        if not ctx.guild:
+            await ctx.reply("❌ A lista de servidores só pode ser usada dentro de um servidor do Discord.")
+            return
+
+        # Extract command parts
+        args = ctx.text.lower().split()
+        action = args[0] if args else "list"
+
+        try:
+            if action in ("add", "remove"):
+                server_id = watchlist.normalize_server_id(args[1]) if len(args) > 1 else None
+                if not server_id:
+                    await ctx.reply(f"❌ Formato inválido. Use: `@bot watch {action} IDdoServidor`")
                     return
-                
-                # Extract Steam ID and name parts
-                parts = content.split(" ", 1)
-                steam_id = parts[0].strip()
-                player_data = parts[1].strip()
-                
-                # Split name and notes/group
-                if "-" in player_data:
-                    name_notes = player_data.split("-", 1)
-                    nickname = name_notes[0].strip()
-                    notes = name_notes[1].strip()
-                    group = notes.split()[0] if notes else None
+
+                if action == "add":
+                    added = await data_access.run(
+                        watchlist.add_watched, ctx.guild.id, server_id, str(ctx.author)
+                    )
+                    poller.add_server(server_id)
+                    if added:
+                        await ctx.reply(f"✅ Servidor `{server_id}` adicionado à lista")
+                    else:
+                        await ctx.reply(f"ℹ️ O servidor `{server_id}` já está na lista")
                 else:
-                    nickname = player_data
-                    notes = ""
-                    group = None
-                
-                try:
-                    # Use app context to access database
-                    from keep_alive import app
-                    from models import db, PlayerInfo
-                    
-                    with app.app_context():
-                        # Check if player exists
-                        player = PlayerInfo.query.filter_by(steam_id=steam_id).first()
-                        
-                        if player:
-                            # Update existing player
-                            player.nickname = nickname
-                            player.notes = notes
-                            player.group = group
-                            db.session.commit()
-                            await message.reply(f"✅ Jogador atualizado: `{nickname}` com ID `{steam_id}`")
-                        else:
-                            # Create new player
-                            player = PlayerInfo(
-                                steam_id=steam_id,
-                                nickname=nickname,
-                                notes=notes,
-                                group=group
-                            )
-                            db.session.add(player)
-                            db.session.commit()
-                            await message.reply(f"✅ Jogador registrado: `{nickname}` com ID `{steam_id}`")
-                except Exception as e:
-                    logger.error(f"Error registering player: {str(e)}")
-                    await message.reply(f"❌ Erro ao registrar jogador: {str(e)}")
-                
-                return
-                
-            # Player info command (not plural 'players')
-            elif "player " in message.content.lower() and not "players" in message.content.lower():
-                logger.info(f"Player lookup command received from {message.author} in {message.guild}")
-                
-                # Extract Steam ID
-                steam_id = message.content.split("player", 1)[1].strip()
-                
-                try:
-                    # Use app context to access database
-                    from keep_alive import app
-                    from models import PlayerInfo
-                    
-                    with app.app_context():
-                        player = PlayerInfo.query.filter_by(steam_id=steam_id).first()
-                        
-                        if player:
-                            embed = discord.Embed(
-                                title=f"Informações do Jogador: {player.nickname}",
-                                color=discord.Color.green()
-                            )
-                            
-                            embed.add_field(name="Steam ID", value=f"`{player.steam_id}`", inline=False)
-                            
-                            if player.group:
-                                embed.add_field(name="Grupo", value=player.group, inline=True)
-                                
-                            if player.notes:
-                                embed.add_field(name="Notas", value=player.notes, inline=False)
-                                
-                            embed.set_footer(text=f"Última atualização: {player.updated_at.strftime('%d/%m/%Y %H:%M')}")
-                            
-                            await message.reply(embed=embed)
-                        else:
-                            await message.reply(f"❌ Nenhum jogador encontrado com o ID `{steam_id}`")
-                except Exception as e:
-                    logger.error(f"Error looking up player: {str(e)}")
-                    await message.reply(f"❌ Erro ao buscar jogador: {str(e)}")
-                
-                return
-                
-            # Check for players command
-            elif "players" in message.content.lower():
-                logger.info(f"Players command received from {message.author} in {message.guild}")
-                
-                # Fixed server ID
-                server_id = "byzd3d"
-                logger.info(f"Fetching data for server ID: {server_id}")
-                
-                # Show typing indicator
-                async with message.channel.typing():
-                    # Create an embed response
-                    embed = discord.Embed(
-                        title=f"FiveM Server Players - {server_id}",
-                        color=discord.Color.blue()
+                    removed, still_watched = await data_access.run(
+                        watchlist.remove_watched, ctx.guild.id, server_id
+                    )
+                    if (not still_watched and server_id not in poller.configured
+                            and not notification_store.channels(server_id)
+                            and not livestatus_store.entries(server_id)):
+                        poller.remove_server(server_id)
+                    if removed:
+                        await ctx.reply(f"✅ Servidor `{server_id}` removido da lista")
+                    else:
+                        await ctx.reply(f"❌ O servidor `{server_id}` não está na lista")
+            else:
+                server_ids = await data_access.run(watchlist.list_watched, ctx.guild.id)
+                if server_ids:
+                    await ctx.reply("📋 Servidores acompanhados: " + ", ".join(f"`{s}`" for s in server_ids))
+                else:
+                    await ctx.reply("📋 Nenhum servidor na lista. Use `@bot watch add IDdoServidor`")
+        except ValueError as e:
+            await ctx.reply(f"❌ {str(e)}")
+        except Exception as e:
+            logger.error(f"Error updating watch list: {str(e)}")
+            await ctx.reply(f"❌ Erro ao atualizar a lista de servidores: {str(e)}")
+
+    @router.command("overview", "Mostra a contagem de jogadores de todos os servidores acompanhados",
+                    concurrency=2, **expensive)
+    async def overview_command(ctx):
+        async with ctx.typing():
+            try:
+                server_ids = []
+                if ctx.guild:
+                    server_ids = await data_access.run(watchlist.list_watched, ctx.guild.id)
+                server_ids = server_ids or [watchlist.DEFAULT_SERVER_ID]
+
+                # Todos os servidores são consultados ao mesmo tempo (com limite de concorrência)
+                snapshots = await snapshot_cache.get_many(server_ids)
+
+                embed = discord.Embed(
+                    title="FiveM - Servidores acompanhados",
+                    color=discord.Color.blue()
+                )
+                total = 0
+                for server_id, data in snapshots.items():
+                    if data['success']:
+                        total += len(data['players'])
+                        value = f"**{len(data['players'])}/{data.get('max_players', 0)}** players online"
+                    else:
+                        value = "⚠️ Dados indisponíveis"
+                    embed.add_field(
+                        name=f"{data['hostname'][:200]} (`{server_id}`)",
+                        value=value,
+                        inline=False
+                    )
+                embed.description = f"**{total}** players online em {len(server_ids)} servidor(es)"
+                embed.timestamp = discord.utils.utcnow()
+                await ctx.reply(embed=embed)
+            except Exception as e:
+                logger.error(f"Error building overview: {str(e)}")
+                await ctx.reply(f"❌ Erro ao consultar os servidores: {str(e)}")
+
+    @router.command("players", "Mostra os jogadores de um servidor: [servidor]", concurrency=4, **expensive)
+    async def players_command(ctx):
+        # Server ID informado no comando, ou o servidor padrão
+        args = ctx.text.lower().split()
+        server_id = watchlist.normalize_server_id(args[0]) if args else watchlist.DEFAULT_SERVER_ID
+        if not server_id:
+            await ctx.reply("❌ ID de servidor inválido. Use: `@bot players [IDdoServidor]`")
+            return
+        logger.info(f"Fetching data for server ID: {server_id}")
+
+        # Show typing indicator
+        async with ctx.typing():
+            # Create an embed response
+            embed = discord.Embed(
+                title=f"FiveM Server Players - {server_id}",
+                color=discord.Color.blue()
+            )
+
+            try:
+                # Dados vêm do cache; chamadas simultâneas compartilham a mesma busca no FiveM
+                data = await snapshot_cache.get(server_id)
+
+                # Se nenhuma fonte funcionou
+                if not data['success']:
+                    # Exibir mensagem de erro
+                    embed.title = "FiveM Server Info"
+                    embed.description = "⚠️ Não foi possível obter dados do servidor FiveM"
+                    embed.add_field(
+                        name="🔍 Status",
+                        value=f"Erro: {data['message']}\n\nO FiveM implementou restrições à API pública. Para dados reais, configure um servidor FiveM próprio ou integre com sua comunidade.",
+                        inline=False
+                    )
+                    embed.add_field(
+                        name="💡 Como encontrar servidores",
+                        value="Você pode encontrar servidores no próprio jogo FiveM ou pelo site: https://servers.fivem.net/",
+                        inline=False
                     )
-                    
+                    embed.add_field(
+                        name="🔧 Como usar o bot",
+                        value=f"Mencione o bot junto com 'players':\n`@{client.user.name} players`",
+                        inline=False
+                    )
+                    await ctx.reply(embed=embed)
+                    return
+
+                players = data['players']
+                server_name = data['hostname']
+                players_count = len(players)
+                # max_players provavelmente não está disponível via scraping
+                max_players = data.get('max_players', 0)
+
+                # Update embed with server info
+                embed.title = server_name
+                embed.description = f"**{players_count}/{max_players}** players online"
+
+                # Add timestamp
+                embed.timestamp = discord.utils.utcnow()
+
+                # Display players or empty message
+                if players:
+                    # Jogadores registrados vêm do índice em memória
                     try:
-                        # Primeiro tentamos a API direta
-                        api_data = get_fivem_players_api(server_id)
-                        
-                        # Se a API falhar, tentamos o scraping
-                        if not api_data['success']:
-                            logger.info("API falhou, tentando web scraping")
-                            # Tentar web scraping como alternativa
-                            scraper_data = get_fivem_players(server_id)
-                            
-                            # Se o scraping também falhar
-                            if not scraper_data['success']:
-                                # Exibir mensagem de erro
-                                embed.title = "FiveM Server Info"
-                                embed.description = "⚠️ Não foi possível obter dados do servidor FiveM"
-                                embed.add_field(
-                                    name="🔍 Status", 
-                                    value=f"Erro: {scraper_data['message']}\n\nO FiveM implementou restrições à API pública. Para dados reais, configure um servidor FiveM próprio ou integre com sua comunidade.", 
-                                    inline=False
-                                )
-                                embed.add_field(
-                                    name="💡 Como encontrar servidores",
-                                    value="Você pode encontrar servidores no próprio jogo FiveM ou pelo site: https://servers.fivem.net/", 
-                                    inline=False
-                                )
-                                embed.add_field(
-                                    name="🔧 Como usar o bot",
-                                    value=f"Mencione o bot junto com 'players':\n`@{client.user.name} players`", 
-                                    inline=False
-                                )
-                                await message.reply(embed=embed)
-                                return
-                            
-                            # Se o scraping funcionou, use esses dados
-                            data = scraper_data
-                            players = data['players']
-                            server_name = data['hostname']
-                            players_count = len(players)
-                            max_players = 0  # Provavelmente não disponível via scraping
-                        else:
-                            # Se a API funcionou, use esses dados
-                            data = api_data
-                            players = data['players']
-                            server_name = data['hostname']
-                            players_count = len(players)
-                            max_players = data.get('max_players', 0)
-                        
-                        # Update embed with server info
-                        embed.title = server_name
-                        embed.description = f"**{players_count}/{max_players}** players online"
-                        
-                        # Add timestamp
-                        embed.timestamp = discord.utils.utcnow()
-                        
-                        # Display players or empty message
-                        if players:
-                            # Sort players by name quando players contém dicionários
-                            try:
-                                # Verificar se players pode ser ordenado
-                                if all(isinstance(player, dict) for player in players):
-                                    players.sort(key=lambda x: x.get('name', '').lower())
-                                else:
-                                    logger.warning("Lista de players não contém apenas dicionários, pulando ordenação")
-                            except Exception as sort_error:
-                                logger.warning(f"Não foi possível ordenar players: {sort_error}")
-                            
-                            # Buscar todos os jogadores registrados de uma vez
-                            from keep_alive import app
-                            from models import PlayerInfo
-                            
-                            registered_players = {}
-                            try:
-                                with app.app_context():
-                                    for player in PlayerInfo.query.all():
-                                        registered_players[player.steam_id] = (player.nickname, player.group)
-                            except Exception as db_error:
-                                logger.warning(f"Erro ao buscar informações do banco de dados: {db_error}")
-                            
-                            # Processar jogadores em paralelo
-                            player_list = []
-                            for player in players:
-                                if not isinstance(player, dict):
-                                    continue
-                                
-                                player_name = player.get('name', 'Unknown')
-                                identifiers = player.get('identifiers', [])
-                                steam_id = next((id for id in identifiers if isinstance(id, str) and id.startswith('steam:')), '')
-                                
-                                # Usar informações do cache
-                                if steam_id in registered_players:
-                                    nickname, group = registered_players[steam_id]
-                                    player_info = f"• **{nickname}**"
-                                    if group:
-                                        player_info += f" ({group})"
-                                else:
-                                    player_info = f"• **{player_name}** | Steam: `{steam_id}`"
-                                
-                                player_list.append(player_info)
-                            
-                            player_list = "\n".join(player_list)
-                            
-                            # Criar dicionário para agrupar jogadores por facção
-                            faction_groups = {
-                                "families": [],
-                                "bennys": [],
-                                "angels": [],
-                                "ballas": [],
-                                "randola": [],
-                                "policia": [],
-                                "vagos": [],
-                                "marabunta": [],
-                                "the lost": [],
-                                "outros": []
-                            }
-
-                            # Distribuir jogadores nos grupos
-                            player_lines = player_list.split('\n')
-                            for player_info in player_lines:
-                                added = False
-                                for faction in faction_groups.keys():
-                                    if faction != "outros" and faction.lower() in player_info.lower():
-                                        faction_groups[faction].append(player_info)
-                                        added = True
-                                        break
-                                if not added:
-                                    faction_groups["outros"].append(player_info)
-
-                            # Criar embeds para cada facção
-                            embeds = []
-                            colors = {
-                                "families": 0x00FF00,  # Verde
-                                "bennys": 0x0000FF,    # Azul
-                                "angels": 0xFFFFFF,    # Branco
-                                "ballas": 0x800080,    # Roxo
-                                "randola": 0xFFA500,   # Laranja
-                                "policia": 0x000080,   # Azul Escuro
-                                "vagos": 0xFFFF00,     # Amarelo
-                                "marabunta": 0x00FFFF, # Ciano
-                                "the lost": 0x808080,  # Cinza
-                                "outros": 0x696969     # Cinza Escuro
-                            }
-
-                            for faction, players in faction_groups.items():
-                                if players:  # Só criar embed se tiver jogadores
-                                    new_embed = discord.Embed(
-                                        title=f"{server_name} - {faction.upper()}",
-                                        color=colors[faction]
-                                    )
-                                    new_embed.description = f"**{players_count}/{max_players}** players online"
-                                    
-                                    # Dividir em chunks se necessário
-                                    chunks = []
-                                    current_chunk = []
-                                    current_length = 0
-                                    
-                                    for player in players:
-                                        if current_length + len(player) + 1 > 1000:
-                                            chunks.append(current_chunk)
-                                            current_chunk = [player]
-                                            current_length = len(player)
-                                        else:
-                                            current_chunk.append(player)
-                                            current_length += len(player) + 1
-                                    
-                                    if current_chunk:
-                                        chunks.append(current_chunk)
-                                    
-                                    for i, chunk in enumerate(chunks):
-                                        if i > 0:  # Se precisar de mais de um embed para a mesma facção
-                                            new_embed = discord.Embed(
-                                                title=f"{server_name} - {faction.upper()} (Cont.)",
-                                                color=colors[faction]
-                                            )
-                                        new_embed.add_field(
-                                            name=f"👥 {faction.upper()} Players",
-                                            value='\n'.join(chunk),
-                                            inline=False
-                                        )
-                                        embeds.append(new_embed)
-                            
-                            # Todos os chunks já foram processados no loop anterior
-                            
-                            # Send all embeds
-                            if embeds:
-                                for e in embeds:
-                                    await message.channel.send(embed=e)
-                                return
-                            else:
-                                embed.add_field(name="👥 Online Players", value="No players online", inline=False)
-                        else:
-                            embed.add_field(name="🔍 Server Status", 
-                                          value="No players online at the moment.", inline=False)
-                        
-                        # Reply to the message with the embed
-                        await message.reply(embed=embed)
-                        
-                    except requests.exceptions.RequestException as e:
-                        logger.error(f"API request error: {str(e)}")
-                        embed = discord.Embed(
-                            title="Error",
-                            description=f"Could not fetch server data: {str(e)}",
-                            color=discord.Color.red()
-                        )
-                        await message.reply(embed=embed)
-                        
-                    except Exception as e:
-                        logger.error(f"Unexpected error: {str(e)}")
-                        embed = discord.Embed(
-                            title="Error",
-                            description=f"An unexpected error occurred: {str(e)}",
-                            color=discord.Color.red()
-                        )
-                        await message.reply(embed=embed)
+                        if not registry.loaded:
+                            await data_access.run(registry.load)
+                    except Exception as db_error:
+                        logger.warning(f"Erro ao buscar informações do banco de dados: {db_error}")
+
+                    # Regras de facção da guild (compiladas e cacheadas)
+                    guild_id = ctx.guild.id if ctx.guild else None
+                    classifier = faction_rules.cached(guild_id)
+                    if classifier is None:
+                        try:
+                            classifier = await data_access.run(faction_rules.classifier, guild_id)
+                        except Exception as db_error:
+                            logger.warning(f"Erro ao carregar regras de facção: {db_error}")
+                            classifier = DEFAULT_CLASSIFIER
+
+                    # Embeds de cada facção; reaproveitados enquanto snapshot, registro e regras não mudam
+                    with STAGE_SECONDS.time("embed_build"):
+                        batches = render_roster(server_id, data, registry, classifier, faction_rules.version)
+
+                    # Send all embeds, até 10 por mensagem
+                    if batches:
+                        with STAGE_SECONDS.time("discord_send"):
+                            for batch in batches:
+                                await ctx.send(embeds=batch)
+                        return
+                    else:
+                        embed.add_field(name="👥 Online Players", value="No players online", inline=False)
+                else:
+                    embed.add_field(name="🔍 Server Status",
+                                  value="No players online at the moment.", inline=False)
+
+                # Reply to the message with the embed
+                await ctx.reply(embed=embed)
+
+            except aiohttp.ClientError as e:
+                logger.error(f"API request error: {str(e)}")
+                embed = discord.Embed(
+                    title="Error",
+                    description=f"Could not fetch server data: {str(e)}",
+                    color=discord.Color.red()
+                )
+                await ctx.reply(embed=embed)
+
+            except Exception as e:
+                logger.error(f"Unexpected error: {str(e)}")
+                embed = discord.Embed(
+                    title="Error",
+                    description=f"An unexpected error occurred: {str(e)}",
+                    color=discord.Color.red()
+                )
+                await ctx.reply(embed=embed)
+
+    # Os mesmos comandos como slash commands (resposta adiada)
+    tree = router.build_tree(client)
+
+    @client.event
+    async def on_message(message):
+        """Handle messages and respond to specific mentions"""
+        # Ignore messages from the bot itself to prevent loops
+        if message.author == client.user:
+            return
+
+        # O comando é a primeira palavra depois da menção
+        if client.user.mentioned_in(message):
+            await router.handle_message(message)
 
     # Run the bot
     try:
@@ -1,21 +1,66 @@
+import startup_profile  # Primeiro import: mede a inicialização desde o início
+import fcntl
+import os
 import threading
 import time
 import logging
-from bot import run_discord_bot
 
 # Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# DEBUG só quando pedido: os logs de depuração custam caro nos caminhos quentes
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
-def start_bot_in_thread():
+# Trava que garante um único bot por máquina, mesmo com vários workers do gunicorn
+BOT_LOCK_PATH = os.environ.get(
+    "BOT_LOCK_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "bot.lock")
+)
+
+_lock_file = None
+
+def acquire_bot_lock():
+    """Tentar ser o único processo com o bot; a trava dura até o processo terminar"""
+    global _lock_file
+    if _lock_file is not None:
+        return True
+    os.makedirs(os.path.dirname(BOT_LOCK_PATH), exist_ok=True)
+    lock_file = open(BOT_LOCK_PATH, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        return False
+    _lock_file = lock_file
+    return True
+
+def run_bot(app):
+    """Criar as tabelas, carregar o bot e executá-lo (bloqueia até o bot terminar)"""
+    from keep_alive import init_db
+
+    with startup_profile.phase("init_db"):
+        init_db(app)
+    with startup_profile.phase("import_bot"):
+        from bot import run_discord_bot
+    return run_discord_bot()
+
+def start_bot_in_thread(app):
     """Start the Discord bot in a separate thread"""
+    if not acquire_bot_lock():
+        logger.info("Outro processo já está executando o bot; este processo só atende a web")
+        return None
     logger.info("Starting bot in a separate thread")
-    bot_thread = threading.Thread(target=run_discord_bot)
+    bot_thread = threading.Thread(target=run_bot, args=(app,))
     bot_thread.daemon = True
     bot_thread.start()
     logger.info("Bot thread started")
     return bot_thread
 
-# When this module is imported, start the bot
-logger.info("Initializing Discord bot")
-bot_thread = start_bot_in_thread()
\ No newline at end of file
+if __name__ == "__main__":
+    # Processo dedicado ao bot (use APP_ROLE=web nos processos web)
+    if not acquire_bot_lock():
+        logger.error("Outro processo já está executando o bot")
+        raise SystemExit(1)
+    from keep_alive import get_app
+    with startup_profile.phase("create_app"):
+        app = get_app()
+    run_bot(app)
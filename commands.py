@@ -0,0 +1,232 @@
+import abc
+import asyncio
+import contextlib
+import os
+import re
+import time
+import logging
+import discord
+from discord import app_commands
+from metrics import COMMAND_SECONDS, COMMANDS_TOTAL
+
+logger = logging.getLogger(__name__)
+
+# Cooldown padrão dos comandos caros: usos permitidos por janela (s), por usuário e por guild
+COMMAND_USER_RATE = int(os.environ.get("COMMAND_USER_RATE", "3"))
+COMMAND_USER_PER = float(os.environ.get("COMMAND_USER_PER", "30"))
+COMMAND_GUILD_RATE = int(os.environ.get("COMMAND_GUILD_RATE", "10"))
+COMMAND_GUILD_PER = float(os.environ.get("COMMAND_GUILD_PER", "30"))
+
+_MENTION_RE = re.compile(r'<@!?\d+>')
+# Acima disso, buckets já recarregados são descartados
+_MAX_COOLDOWN_KEYS = 10000
+
+
+class Cooldown:
+    """
+    Limite de `rate` usos a cada `per` segundos por chave (usuário ou guild).
+
+    Cada chave tem um token bucket; `peek()` diz quantos segundos faltam para o
+    próximo uso permitido (0 se já pode) sem gastar nada, e `consume()` gasta um uso.
+    """
+
+    def __init__(self, rate, per):
+        self.rate = rate
+        self.per = per
+        self._buckets = {}
+
+    def _tokens(self, key, now):
+        tokens, updated = self._buckets.get(key, (self.rate, now))
+        return min(self.rate, tokens + (now - updated) * self.rate / self.per)
+
+    def peek(self, key, now=None):
+        now = time.monotonic() if now is None else now
+        tokens = self._tokens(key, now)
+        if tokens < 1:
+            return (1 - tokens) * self.per / self.rate
+        return 0.0
+
+    def consume(self, key, now=None):
+        now = time.monotonic() if now is None else now
+        self._buckets[key] = (self._tokens(key, now) - 1, now)
+        if len(self._buckets) > _MAX_COOLDOWN_KEYS:
+            self._prune(now)
+
+    def _prune(self, now):
+        full = [key for key, (tokens, updated) in self._buckets.items()
+                if tokens + (now - updated) * self.rate / self.per >= self.rate]
+        for key in full:
+            del self._buckets[key]
+
+
+class Command:
+    """Comando registrado no roteador"""
+    __slots__ = ("name", "handler", "description", "aliases", "semaphore",
+                 "user_cooldown", "guild_cooldown", "slash")
+
+    def __init__(self, name, handler, description, aliases=(), concurrency=None,
+                 user_cooldown=None, guild_cooldown=None, slash=True):
+        self.name = name
+        self.handler = handler
+        self.description = description
+        self.aliases = tuple(aliases)
+        self.semaphore = asyncio.Semaphore(concurrency) if concurrency else None
+        self.user_cooldown = Cooldown(*user_cooldown) if user_cooldown else None
+        self.guild_cooldown = Cooldown(*guild_cooldown) if guild_cooldown else None
+        self.slash = slash
+
+
+class CommandContext(abc.ABC):
+    """Interface comum aos comandos por menção e aos slash commands"""
+
+    def __init__(self, command, text, guild, channel, author, attachments=()):
+        self.command = command
+        # Texto depois do nome do comando (caixa original) e suas palavras
+        self.text = text
+        self.args = text.split()
+        self.guild = guild
+        self.channel = channel
+        self.author = author
+        self.attachments = list(attachments)
+
+    @abc.abstractmethod
+    async def reply(self, content=None, **kwargs):
+        """Responder à mensagem ou interação que chamou o comando"""
+
+    @abc.abstractmethod
+    async def send(self, content=None, **kwargs):
+        """Enviar uma mensagem no canal do comando"""
+
+    def typing(self):
+        return contextlib.nullcontext()
+
+
+class MessageContext(CommandContext):
+    def __init__(self, command, text, message):
+        super().__init__(command, text, message.guild, message.channel, message.author, message.attachments)
+        self.message = message
+
+    async def reply(self, content=None, **kwargs):
+        return await self.message.reply(content, **kwargs)
+
+    async def send(self, content=None, **kwargs):
+        return await self.channel.send(content, **kwargs)
+
+    def typing(self):
+        return self.channel.typing()
+
+
+class InteractionContext(CommandContext):
+    """Slash command: a resposta é adiada (defer) e enviada depois via followup"""
+
+    def __init__(self, command, text, interaction):
+        super().__init__(command, text, interaction.guild, interaction.channel, interaction.user)
+        self.interaction = interaction
+
+    async def reply(self, content=None, **kwargs):
+        return await self.interaction.followup.send(content, **kwargs)
+
+    send = reply
+
+
+class CommandRouter:
+    """
+    Roteador de comandos do bot.
+
+    O nome do comando é a primeira palavra depois da menção (ou o slash
+    command) e a busca é um dicionário. Cada comando pode ter um semáforo
+    (máximo de execuções simultâneas) e cooldowns por usuário e por guild.
+    """
+
+    def __init__(self):
+        self._commands = {}
+        self._lookup = {}
+
+    def command(self, name, description, aliases=(), concurrency=None,
+                user_cooldown=None, guild_cooldown=None, slash=True):
+        """Decorador para registrar um handler `async def handler(ctx)`"""
+        def decorator(handler):
+            command = Command(name, handler, description, aliases, concurrency,
+                              user_cooldown, guild_cooldown, slash)
+            self._commands[name] = command
+            for key in (name, *command.aliases):
+                self._lookup[key] = command
+            return handler
+        return decorator
+
+    def get(self, name):
+        return self._lookup.get(name.lower())
+
+    def commands(self):
+        return list(self._commands.values())
+
+    def parse(self, content):
+        """Separar (comando, texto restante) de uma mensagem que menciona o bot"""
+        name, _, text = _MENTION_RE.sub(" ", content).strip().partition(" ")
+        return self.get(name) if name else None, text.strip()
+
+    async def handle_message(self, message):
+        command, text = self.parse(message.content)
+        if command is None:
+            return False
+        await self.invoke(command, MessageContext(command, text, message))
+        return True
+
+    async def handle_interaction(self, command, interaction, text):
+        # Adiar a resposta antes de qualquer trabalho (o Discord exige resposta em 3s)
+        await interaction.response.defer(thinking=True)
+        await self.invoke(command, InteractionContext(command, text or "", interaction))
+
+    async def invoke(self, command, ctx):
+        retry_after = self._retry_after(command, ctx)
+        if retry_after:
+            COMMANDS_TOTAL.inc(command.name, "cooldown")
+            await ctx.reply(f"⏳ Aguarde {retry_after:.0f}s para usar `{command.name}` de novo.")
+            return
+
+        logger.info(f"Comando {command.name} de {ctx.author} em {ctx.guild}")
+        try:
+            with COMMAND_SECONDS.time(command.name):
+                if command.semaphore is None:
+                    await command.handler(ctx)
+                else:
+                    async with command.semaphore:
+                        await command.handler(ctx)
+            COMMANDS_TOTAL.inc(command.name, "ok")
+        except Exception as e:
+            COMMANDS_TOTAL.inc(command.name, "error")
+            logger.error(f"Erro no comando {command.name}: {str(e)}")
+            try:
+                await ctx.reply(f"❌ Erro inesperado: {str(e)}")
+            except discord.HTTPException:
+                pass
+
+    def _retry_after(self, command, ctx):
+        # Consultar os dois limites primeiro: só gasta um uso se o comando vai rodar
+        buckets = []
+        if command.user_cooldown is not None:
+            buckets.append((command.user_cooldown, ctx.author.id))
+        if command.guild_cooldown is not None and ctx.guild is not None:
+            buckets.append((command.guild_cooldown, ctx.guild.id))
+
+        now = time.monotonic()
+        retry_after = max((cooldown.peek(key, now) for cooldown, key in buckets), default=0)
+        if retry_after:
+            return max(retry_after, 1)
+        for cooldown, key in buckets:
+            cooldown.consume(key, now)
+        return 0
+
+    def build_tree(self, client):
+        """Criar a CommandTree com um slash command para cada comando (argumentos em texto livre)"""
+        tree = app_commands.CommandTree(client)
+        for command in self._commands.values():
+            if command.slash:
+                tree.add_command(self._slash_command(command))
+        return tree
+
+    def _slash_command(self, command):
+        async def callback(interaction: discord.Interaction, argumentos: str = ""):
+            await self.handle_interaction(command, interaction, argumentos)
+
+        return app_commands.Command(name=command.name, description=command.description[:100], callback=callback)
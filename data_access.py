@@ -0,0 +1,102 @@
+import asyncio
+import functools
+import os
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Threads dedicadas ao banco de dados do bot (independente do pool do Flask)
+BOT_DB_WORKERS = int(os.environ.get("BOT_DB_WORKERS", "4"))
+# Conexões do pool do bot; por padrão uma por thread
+BOT_DB_POOL_SIZE = int(os.environ.get("BOT_DB_POOL_SIZE", str(BOT_DB_WORKERS)))
+# pool_pre_ping adiciona uma ida ao banco a cada checkout; pode ser desligado com 0
+BOT_DB_PRE_PING = os.environ.get("BOT_DB_PRE_PING", "1") != "0"
+
+
+class DataAccess:
+    """
+    Camada de acesso ao banco usada pelo bot e pelos módulos de dados.
+
+    Tem engine e pool de conexões próprios (BOT_DB_POOL_SIZE) e um pool de
+    threads limitado (BOT_DB_WORKERS). Handlers async usam `await run(fn, ...)`
+    e nunca bloqueiam o event loop do Discord; código síncrono usa
+    `session_scope()` diretamente.
+    """
+
+    def __init__(self, workers=BOT_DB_WORKERS, pool_size=BOT_DB_POOL_SIZE, pre_ping=BOT_DB_PRE_PING):
+        self.workers = workers
+        self.pool_size = pool_size
+        self.pre_ping = pre_ping
+        self._executor = None
+        self._engine = None
+        self._sessionmaker = None
+        self._lock = threading.Lock()
+
+    @property
+    def engine(self):
+        self._ensure_engine()
+        return self._engine
+
+    def _ensure_engine(self):
+        if self._engine is None:
+            with self._lock:
+                if self._engine is None:
+                    self._engine = self._create_engine()
+                    self._sessionmaker = sessionmaker(self._engine, expire_on_commit=False)
+
+    def _create_engine(self):
+        # A URL vem do Flask-SQLAlchemy já resolvida (caminho do SQLite dentro de instance/)
+        from keep_alive import get_app
+        from models import db
+
+        with get_app().app_context():
+            url = db.engine.url
+
+        options = {"pool_recycle": 300, "pool_pre_ping": self.pre_ping}
+        if url.get_backend_name() != "sqlite" or url.database not in (None, "", ":memory:"):
+            options.update(pool_size=self.pool_size, max_overflow=0)
+        logger.info(f"Pool de conexões do bot: {self.pool_size} conexões, {self.workers} threads")
+        return create_engine(url, **options)
+
+    @contextmanager
+    def session_scope(self):
+        """Sessão com commit no final (ou rollback em caso de erro)"""
+        self._ensure_engine()
+        session = self._sessionmaker()
+        try:
+            yield session
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    async def run(self, fn, *args, **kwargs):
+        """Executar `fn` no pool de threads do banco e aguardar o resultado"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bot-db")
+        loop = asyncio.get_running_loop()
+        # Inclui a espera por uma thread livre
+        with STAGE_SECONDS.time("db"):
+            return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    def stats(self):
+        pool = self._engine.pool if self._engine is not None else None
+        return {
+            "workers": self.workers,
+            "pool_size": self.pool_size,
+            "pool_status": pool.status() if pool is not None else None,
+        }
+
+
+# Camada compartilhada do processo
+data_access = DataAccess()
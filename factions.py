@@ -0,0 +1,194 @@
+import re
+import threading
+import logging
+from data_access import data_access
+
+logger = logging.getLogger(__name__)
+
+# Facção de quem não se encaixa em nenhuma regra; sempre exibida por último
+FALLBACK_FACTION = "outros"
+FALLBACK_COLOR = 0x696969  # Cinza Escuro
+
+# Regras usadas pelas guilds que não configuraram as suas: (nome, cor, palavras-chave)
+DEFAULT_RULES = [
+    ("families", 0x00FF00, ("families",)),     # Verde
+    ("bennys", 0x0000FF, ("bennys",)),         # Azul
+    ("angels", 0xFFFFFF, ("angels",)),         # Branco
+    ("ballas", 0x800080, ("ballas",)),         # Roxo
+    ("randola", 0xFFA500, ("randola",)),       # Laranja
+    ("policia", 0x000080, ("policia",)),       # Azul Escuro
+    ("vagos", 0xFFFF00, ("vagos",)),           # Amarelo
+    ("marabunta", 0x00FFFF, ("marabunta",)),   # Ciano
+    ("the lost", 0x808080, ("the lost",)),     # Cinza
+]
+
+
+class FactionClassifier:
+    """
+    Classificador de facções compilado a partir de uma lista de regras.
+
+    Todas as palavras-chave viram uma única expressão regular com um grupo
+    nomeado por regra. O grupo registrado do jogador tem prioridade; o nome
+    no jogo só é usado se o grupo não casar com nenhuma regra.
+    """
+
+    def __init__(self, rules):
+        # rules: [(nome, cor, palavras-chave)] na ordem de exibição
+        self.rules = [(name, color, tuple(k for k in keywords if k)) for name, color, keywords in rules]
+        self.colors = {name: color for name, color, _ in self.rules}
+        self.colors[FALLBACK_FACTION] = self.colors.get(FALLBACK_FACTION, FALLBACK_COLOR)
+        # Guilds com as mesmas regras compartilham o roster renderizado
+        self.key = tuple(rule for rule in self.rules if rule[0] != FALLBACK_FACTION) + (self.colors[FALLBACK_FACTION],)
+        self.order = [name for name, _, _ in self.rules if name != FALLBACK_FACTION] + [FALLBACK_FACTION]
+
+        alternatives = []
+        self._names = {}
+        for index, (name, _, keywords) in enumerate(self.rules):
+            if not keywords or name == FALLBACK_FACTION:
+                continue
+            self._names[f"r{index}"] = name
+            # Palavras mais longas primeiro para "the lost" vencer "lost" na mesma posição
+            words = sorted(keywords, key=len, reverse=True)
+            alternatives.append(f"(?P<r{index}>{'|'.join(re.escape(w) for w in words)})")
+        self._pattern = re.compile("|".join(alternatives), re.IGNORECASE) if alternatives else None
+
+    def match(self, text):
+        """Facção cuja palavra-chave aparece primeiro no texto, ou None"""
+        if not text or self._pattern is None:
+            return None
+        found = self._pattern.search(text)
+        return self._names[found.lastgroup] if found else None
+
+    def classify(self, group, name):
+        """Facção do jogador a partir do grupo registrado e do nome no jogo"""
+        return self.match(group) or self.match(name) or FALLBACK_FACTION
+
+
+DEFAULT_CLASSIFIER = FactionClassifier(DEFAULT_RULES)
+
+
+class FactionRuleStore:
+    """
+    Regras de facção por guild, guardadas em FactionRule e cacheadas já compiladas.
+
+    Uma guild que nunca alterou as facções não tem linhas e usa as regras
+    padrão; a primeira alteração copia as padrão e grava uma linha da facção
+    FALLBACK_FACTION, que marca a guild como configurada (mesmo que depois
+    remova todas as regras). `version` aumenta a cada alteração de qualquer guild.
+    """
+
+    def __init__(self):
+        self._classifiers = {}
+        self._lock = threading.Lock()
+        self.version = 0
+
+    def cached(self, guild_id):
+        """Classificador já carregado da guild (ou o padrão fora de guilds), ou None"""
+        if guild_id is None:
+            return DEFAULT_CLASSIFIER
+        return self._classifiers.get(guild_id)
+
+    def classifier(self, guild_id):
+        """Classificador da guild, carregando as regras do banco se necessário"""
+        classifier = self.cached(guild_id)
+        if classifier is None:
+            version = self.version
+            rules = self._load_rules(guild_id)
+            classifier = FactionClassifier(rules) if rules else DEFAULT_CLASSIFIER
+            with self._lock:
+                # Uma alteração durante a leitura invalidou estas regras: não cachear
+                if self.version == version:
+                    self._classifiers[guild_id] = classifier
+        return classifier
+
+    def _load_rules(self, guild_id):
+        from models import db, FactionRule
+
+        with data_access.session_scope() as session:
+            rows = session.scalars(
+                db.select(FactionRule).filter_by(guild_id=guild_id).order_by(FactionRule.position, FactionRule.id)
+            ).all()
+            return [(row.name, row.color, _split_keywords(row.keywords)) for row in rows]
+
+    def set_rule(self, guild_id, name, color, keywords):
+        """Criar ou atualizar uma regra; retorna True se a regra é nova"""
+        from models import db, FactionRule
+
+        with data_access.session_scope() as session:
+            self._seed_defaults(session, guild_id)
+            rule = session.scalars(db.select(FactionRule).filter_by(guild_id=guild_id, name=name)).first()
+            created = rule is None
+            if created:
+                last = session.scalar(
+                    db.select(db.func.max(FactionRule.position)).filter_by(guild_id=guild_id)
+                )
+                rule = FactionRule(guild_id=guild_id, name=name, position=(last or 0) + 1)
+                session.add(rule)
+            rule.color = color
+            rule.keywords = ",".join(keywords)
+        self._invalidate(guild_id)
+        return created
+
+    def remove_rule(self, guild_id, name):
+        """Remover uma regra; retorna False se ela não existia"""
+        from models import db, FactionRule
+
+        with data_access.session_scope() as session:
+            self._seed_defaults(session, guild_id)
+            deleted = session.execute(
+                db.delete(FactionRule).filter_by(guild_id=guild_id, name=name)
+                .where(FactionRule.name != FALLBACK_FACTION)
+            ).rowcount
+        self._invalidate(guild_id)
+        return deleted > 0
+
+    def reset(self, guild_id):
+        """Apagar as regras da guild, voltando para as regras padrão"""
+        from models import db, FactionRule
+
+        with data_access.session_scope() as session:
+            session.execute(db.delete(FactionRule).filter_by(guild_id=guild_id))
+        self._invalidate(guild_id)
+
+    def _seed_defaults(self, session, guild_id):
+        """Na primeira alteração, copiar as regras padrão e marcar a guild como configurada"""
+        from models import db, FactionRule
+
+        marked = session.scalar(
+            db.select(FactionRule.id).filter_by(guild_id=guild_id, name=FALLBACK_FACTION)
+        )
+        if marked is not None:
+            return
+        exists = session.scalar(db.select(FactionRule.id).filter_by(guild_id=guild_id).limit(1))
+        if exists is None:
+            for position, (name, color, keywords) in enumerate(DEFAULT_RULES):
+                session.add(FactionRule(
+                    guild_id=guild_id, name=name, color=color,
+                    keywords=",".join(keywords), position=position
+                ))
+        # Linha da facção padrão, sem palavras-chave: a guild continua configurada sem regras
+        session.add(FactionRule(
+            guild_id=guild_id, name=FALLBACK_FACTION, color=FALLBACK_COLOR, keywords="", position=-1
+        ))
+        session.flush()
+
+    def _invalidate(self, guild_id):
+        with self._lock:
+            self._classifiers.pop(guild_id, None)
+            self.version += 1
+
+
+def _split_keywords(value):
+    return tuple(k.strip().lower() for k in (value or "").split(",") if k.strip())
+
+
+def parse_color(value):
+    """Cor no formato #RRGGBB (ou RRGGBB) para inteiro, ou None se inválida"""
+    value = (value or "").strip().lstrip("#")
+    if re.fullmatch(r"[0-9a-fA-F]{6}", value):
+        return int(value, 16)
+    return None
+
+
+# Regras compartilhadas do processo
+faction_rules = FactionRuleStore()
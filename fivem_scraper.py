@@ -1,142 +1,536 @@
-import requests
-import trafilatura
+import asyncio
+import aiohttp
+import codecs
+import html
 import re
 import json
-from bs4 import BeautifulSoup
 import logging
+from http_client import http_client
+from upstream import is_throttled, upstream_health
+from metrics import STAGE_SECONDS, UPSTREAM_REQUESTS_TOTAL
+from player_model import EMPTY_SNAPSHOT, PlayerSnapshot
 
 logger = logging.getLogger(__name__)
 
-def get_fivem_players(server_id):
+# Timeouts padrão (em segundos) para cada requisição
+SCRAPE_TIMEOUT = 15
+API_TIMEOUT = 10
+
+# Atraso entre o disparo de cada fonte no modo "hedged" (0 = todas em paralelo)
+HEDGE_DELAY = 0.5
+
+# Tamanho dos blocos lidos da página de detalhes no modo streaming
+SCRAPE_CHUNK_SIZE = 64 * 1024
+
+# Headers para parecer um navegador real
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Referer': 'https://servers.fivem.net/',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Cache-Control': 'max-age=0'
+}
+
+API_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'application/json',
+    'Origin': 'https://servers.fivem.net',
+    'Referer': 'https://servers.fivem.net/'
+}
+
+
+def _failure(server_id, message, status=None):
+    """Resultado padrão de falha usado por todos os coletores (`status` = último HTTP status)"""
+    return {
+        "success": False,
+        "message": message,
+        "hostname": f"FiveM Server {server_id}",
+        "players": EMPTY_SNAPSHOT,
+        "status": status
+    }
+
+
+# Endpoints conhecidos da API do FiveM, em ordem de preferência (o benchmark aponta para um servidor local)
+API_ENDPOINTS = [
+    "https://servers-frontend.fivem.net/api/servers/single/{server_id}",
+    "https://servers-live.fivem.net/api/servers/single/{server_id}",
+    "https://servers-data.fivem.net/{server_id}"
+]
+SERVER_PAGE_URL = "https://servers.fivem.net/servers/detail/{server_id}"
+
+
+def _api_endpoints(server_id):
+    """Endpoints conhecidos da API do FiveM, em ordem de preferência"""
+    return [endpoint.format(server_id=server_id) for endpoint in API_ENDPOINTS]
+
+
+def _endpoint_key(url, server_id):
+    """Nome do endpoint para o circuit breaker (URL sem o id do servidor)"""
+    return url.split("://", 1)[-1].replace(server_id, "{id}")
+
+
+def _status_label(status, timed_out):
+    """Rótulo do resultado de uma requisição nas métricas"""
+    if status is not None:
+        return str(status)
+    return "timeout" if timed_out else "error"
+
+
+def _circuit_open(server_id, key):
+    return _failure(server_id, f"Endpoint {key} desativado temporariamente (circuit breaker aberto)")
+
+
+NUXT_MARKER = 'window.nuxt='
+_TITLE_RE = re.compile(r'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+# Só os caracteres que mudam o estado do scanner de JSON
+_JSON_TOKENS_RE = re.compile(r'[{}\[\]"\\]')
+
+
+class NuxtPayloadExtractor:
     """
-    Tentar obter dados do servidor FiveM via web scraping
+    Localizar e recortar o JSON de `window.nuxt=` a partir de um fluxo de texto.
+
+    O texto é recebido em blocos via `feed()`. Depois do marcador, um scanner
+    que respeita strings e escapes acompanha o balanceamento de {} e []; assim
+    que o objeto fecha, `done` fica verdadeiro e o restante da página não
+    precisa ser lido. Também captura o <title> se ele aparecer antes.
     """
-    url = f"https://servers.fivem.net/servers/detail/{server_id}"
-    
+
+    def __init__(self):
+        self.title = None
+        self.payload = None
+        self.failed = False
+        self._pending = ''
+        self._parts = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def done(self):
+        return self.payload is not None or self.failed
+
+    def feed(self, text):
+        """Processar mais um bloco de texto; retorna `done`"""
+        if self.done:
+            return True
+        if self._parts is None:
+            text = self._find_marker(self._pending + text)
+            if text is None:
+                return False
+        self._scan(text)
+        return self.done
+
+    def _find_marker(self, text):
+        if self.title is None:
+            match = _TITLE_RE.search(text)
+            if match:
+                self.title = html.unescape(match.group(1).strip())
+
+        index = text.find(NUXT_MARKER)
+        if index == -1:
+            # Guardar só o suficiente para achar o marcador/título entre dois blocos
+            keep = len(NUXT_MARKER) - 1
+            if self.title is None:
+                title_start = text.lower().rfind('<title')
+                if title_start != -1:
+                    keep = max(keep, len(text) - title_start)
+            self._pending = text[-keep:]
+            return None
+
+        self._pending = ''
+        self._parts = []
+        return text[index + len(NUXT_MARKER):].lstrip()
+
+    def _scan(self, text):
+        if not self._parts and self._depth == 0:
+            text = text.lstrip()
+            if not text:
+                return
+            if text[0] not in '{[':
+                # Não é um literal JSON (ex.: função serializada); deixar para o fallback
+                self.failed = True
+                return
+
+        # Posição do caractere escapado por uma barra invertida (pode estar no bloco anterior)
+        escaped_at = 0 if self._escape else -1
+        self._escape = False
+        for match in _JSON_TOKENS_RE.finditer(text):
+            position = match.start()
+            if position == escaped_at:
+                continue
+            char = match.group()
+            if self._in_string:
+                if char == '\\':
+                    escaped_at = position + 1
+                elif char == '"':
+                    self._in_string = False
+                continue
+            if char == '"':
+                self._in_string = True
+            elif char in '{[':
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(text[:position + 1])
+                    self.payload = ''.join(self._parts)
+                    self._parts = []
+                    return
+        self._escape = escaped_at == len(text)
+        self._parts.append(text)
+
+
+def extract_nuxt_payload(text):
+    """Extrair o JSON de `window.nuxt=` de um texto completo (ou None)"""
+    extractor = NuxtPayloadExtractor()
+    extractor.feed(text)
+    return extractor.payload
+
+
+def _players_from_nuxt(payload):
+    """Navegar nos dados do Nuxt e normalizar os jogadores do servidor (PlayerSnapshot ou None)"""
     try:
-        # Configurar headers para parecer um navegador real
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Referer': 'https://servers.fivem.net/',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Cache-Control': 'max-age=0'
-        }
-        
-        response = requests.get(url, headers=headers, timeout=15)
-        
-        # Se obtermos uma resposta HTML
-        if response.status_code == 200:
-            # Usar trafilatura para extrair o conteúdo principal
-            html_content = response.text
-            logger.info(f"Página carregada com sucesso: {len(html_content)} bytes")
-            
-            # Usando BeautifulSoup para analisar o HTML
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # Procurar dados de jogadores que estão geralmente em um script JSON
-            scripts = soup.find_all('script')
-            player_data = []
-            
-            # Procurar por scripts que contenham dados do servidor
-            for script in scripts:
-                if script.string and 'window.nuxt=' in script.string:
-                    logger.info("Encontrado script com dados do Nuxt")
-                    # Extrair os dados JSON
-                    match = re.search(r'window\.nuxt=(.+?);', script.string, re.DOTALL)
-                    if match:
-                        try:
-                            nuxt_data = json.loads(match.group(1))
-                            # Navegar nos dados para encontrar informações do servidor
-                            if 'state' in nuxt_data and 'serverData' in nuxt_data['state']:
-                                server_data = nuxt_data['state']['serverData']
-                                if 'players' in server_data:
-                                    player_data = server_data['players']
-                                    break
-                        except json.JSONDecodeError:
-                            logger.error("Erro ao decodificar JSON")
-                            continue
-            
+        nuxt_data = json.loads(payload)
+    except json.JSONDecodeError:
+        logger.error("Erro ao decodificar JSON")
+        return None
+    # Navegar nos dados para encontrar informações do servidor
+    if isinstance(nuxt_data, dict) and 'serverData' in nuxt_data.get('state', {}):
+        server_data = nuxt_data['state']['serverData']
+        if 'players' in server_data:
+            return PlayerSnapshot.from_payload(server_data['players'])
+    return None
+
+
+def _parse_server_page(html_content, server_id):
+    """
+    Extrair jogadores e hostname do HTML completo da página de detalhes do servidor.
+
+    Caminho lento, usado só quando o extrator em streaming não encontra os dados.
+    """
+    # Usando BeautifulSoup para analisar o HTML (importado só quando o fallback é necessário)
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_content, 'html.parser')
+
+    # Procurar dados de jogadores que estão geralmente em um script JSON
+    scripts = soup.find_all('script')
+    player_data = EMPTY_SNAPSHOT
+
+    # Procurar por scripts que contenham dados do servidor
+    for script in scripts:
+        if script.string and NUXT_MARKER in script.string:
+            logger.info("Encontrado script com dados do Nuxt")
+            # Extrair os dados JSON
+            payload = extract_nuxt_payload(script.string)
+            players = _players_from_nuxt(payload) if payload else None
+            if players is not None:
+                player_data = players
+                break
+
+    return {
+        "success": True,
+        "message": "Dados obtidos via web scraping",
+        "source": "scrape",
+        "hostname": soup.title.string if soup.title else "FiveM Server",
+        "players": player_data
+    }
+
+
+async def _stream_server_page(response, server_id):
+    """
+    Ler a página em blocos só até o fim do JSON do Nuxt.
+
+    Se o payload não for encontrado, cai para o parse completo com BeautifulSoup.
+    """
+    decoder = codecs.getincrementaldecoder(response.charset or 'utf-8')(errors='replace')
+    extractor = NuxtPayloadExtractor()
+    chunks = []
+    size = 0
+
+    async for chunk in response.content.iter_chunked(SCRAPE_CHUNK_SIZE):
+        size += len(chunk)
+        text = decoder.decode(chunk)
+        chunks.append(text)
+        if extractor.feed(text):
+            break
+    else:
+        tail = decoder.decode(b'', final=True)
+        chunks.append(tail)
+        extractor.feed(tail)
+
+    if extractor.payload is not None:
+        with STAGE_SECONDS.time("parse"):
+            players = _players_from_nuxt(extractor.payload)
+        if players is not None:
+            logger.info(f"Dados do Nuxt extraídos após ler {size} bytes")
             return {
                 "success": True,
                 "message": "Dados obtidos via web scraping",
-                "hostname": soup.title.string if soup.title else "FiveM Server",
-                "players": player_data
-            }
-        
-        # Se for redirecionado para Cloudflare ou outro bloqueador
-        else:
-            logger.warning(f"Resposta não bem-sucedida: {response.status_code}")
-            return {
-                "success": False,
-                "message": f"Não foi possível acessar a página do servidor (Status: {response.status_code})",
-                "hostname": f"FiveM Server {server_id}",
-                "players": []
+                "source": "scrape",
+                "hostname": extractor.title or "FiveM Server",
+                "players": players
             }
-    
-    except Exception as e:
-        logger.error(f"Erro ao obter dados do servidor: {str(e)}")
+
+    # O parse completo do HTML é pesado; roda fora do event loop
+    if extractor.done:
+        # Página lida só em parte: completar antes do fallback
+        async for chunk in response.content.iter_chunked(SCRAPE_CHUNK_SIZE):
+            chunks.append(decoder.decode(chunk))
+        chunks.append(decoder.decode(b'', final=True))
+    html_content = ''.join(chunks)
+    logger.info(f"Página carregada com sucesso: {len(html_content)} bytes")
+    with STAGE_SECONDS.time("parse"):
+        return await asyncio.to_thread(_parse_server_page, html_content, server_id)
+
+
+def _parse_api_payload(data, server_id):
+    """
+    Converter a resposta JSON da API no formato usado pelo bot (ou None se inválida)
+    """
+    if isinstance(data, dict) and 'Data' in data and 'players' in data['Data']:
         return {
-            "success": False,
-            "message": f"Erro ao obter dados: {str(e)}",
-            "hostname": f"FiveM Server {server_id}",
-            "players": []
+            "success": True,
+            "message": "Dados obtidos via API",
+            "source": "api",
+            "hostname": data['Data'].get('hostname', f"FiveM Server {server_id}"),
+            "players": PlayerSnapshot.from_payload(data['Data']['players']),
+            "max_players": data['Data'].get('svMaxclients', 0)
         }
+    return None
+
+
+async def get_fivem_players_async(server_id, timeout=SCRAPE_TIMEOUT, session=None):
+    """
+    Tentar obter dados do servidor FiveM via web scraping, sem bloquear o event loop.
+
+    `timeout` é o prazo total da requisição; cancelar a task interrompe o download.
+    """
+    url = SERVER_PAGE_URL.format(server_id=server_id)
+    key = _endpoint_key(url, server_id)
+    breaker = upstream_health.breaker(key)
+    if not breaker.allow():
+        UPSTREAM_REQUESTS_TOTAL.inc(key, "circuit_open")
+        return _circuit_open(server_id, key)
+
+    status = None
+    timed_out = False
+    try:
+        await upstream_health.throttle(url)
+        async with _session_scope(session) as http:
+            with STAGE_SECONDS.time("scrape"):
+                async with http.get(url, headers=BROWSER_HEADERS,
+                                    timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    status = response.status
+                    # Se obtermos uma resposta HTML
+                    if response.status == 200:
+                        return await _stream_server_page(response, server_id)
+
+                    # Se for redirecionado para Cloudflare ou outro bloqueador
+                    logger.warning(f"Resposta não bem-sucedida: {response.status}")
+                    return _failure(server_id, f"Não foi possível acessar a página do servidor (Status: {response.status})",
+                                    status=response.status)
+
+    except asyncio.TimeoutError:
+        timed_out = True
+        logger.error(f"Tempo esgotado ao obter dados do servidor {server_id}")
+        return _failure(server_id, f"Erro ao obter dados: tempo esgotado após {timeout}s")
+    except Exception as e:
+        logger.error(f"Erro ao obter dados do servidor: {str(e)}")
+        return _failure(server_id, f"Erro ao obter dados: {str(e)}")
+    finally:
+        breaker.record(status, timed_out)
+        UPSTREAM_REQUESTS_TOTAL.inc(key, _status_label(status, timed_out))
+
+
+async def get_fivem_players_api_async(server_id, timeout=API_TIMEOUT, deadline=None, session=None):
+    """
+    Tentar acessar a API direta do FiveM (provavelmente bloqueada), sem bloquear o event loop.
+
+    `timeout` limita cada endpoint; `deadline` (opcional) limita a soma de todas as tentativas.
+    """
+    status = None
+    try:
+        async with asyncio.timeout(deadline):
+            async with _session_scope(session) as http:
+                # Tentar vários endpoints conhecidos
+                for endpoint in _api_endpoints(server_id):
+                    result = await _fetch_api_endpoint(http, endpoint, server_id, timeout)
+                    if result['success']:
+                        return result
+                    status = result['status'] or status
+    except TimeoutError:
+        logger.error(f"Prazo total de {deadline}s esgotado para a API do servidor {server_id}")
+
+    # Se chegarmos aqui, todos os endpoints falharam
+    return _failure(server_id, "Todos os endpoints da API falharam (acesso bloqueado ou indisponível)", status)
+
+
+async def _fetch_api_endpoint(http, endpoint, server_id, timeout):
+    """Consultar um único endpoint da API; nunca levanta exceção"""
+    key = _endpoint_key(endpoint, server_id)
+    breaker = upstream_health.breaker(key)
+    if not breaker.allow():
+        # Endpoint sabidamente fora do ar: não gastar o timeout nele
+        UPSTREAM_REQUESTS_TOTAL.inc(key, "circuit_open")
+        return _circuit_open(server_id, key)
+
+    status = None
+    timed_out = False
+    try:
+        await upstream_health.throttle(endpoint)
+        logger.debug(f"Tentando endpoint: {endpoint}")
+        # Requisição condicional: um 304 reaproveita o último corpo recebido
+        with STAGE_SECONDS.time("upstream_api"):
+            status, body = await http_client.fetch(endpoint, headers=API_HEADERS, timeout=timeout,
+                                                   conditional=True, session=http)
+        if status == 200:
+            with STAGE_SECONDS.time("parse"):
+                result = _parse_api_payload(json.loads(body), server_id)
+            logger.info(f"Sucesso com endpoint: {endpoint}")
+            if result is not None:
+                return result
+        else:
+            logger.warning(f"Falha no endpoint {endpoint}: {status}")
+
+    except asyncio.TimeoutError:
+        timed_out = True
+        logger.error(f"Erro no endpoint {endpoint}: tempo esgotado após {timeout}s")
+    except Exception as e:
+        logger.error(f"Erro no endpoint {endpoint}: {str(e)}")
+    finally:
+        breaker.record(status, timed_out)
+        UPSTREAM_REQUESTS_TOTAL.inc(key, _status_label(status, timed_out))
+    return _failure(server_id, f"Falha no endpoint {endpoint}", status)
+
+
+async def get_fivem_server_data_async(server_id, hedge_delay=HEDGE_DELAY, deadline=None, session=None):
+    """
+    Obter os dados do servidor usando todas as fontes (endpoints da API e scraping).
+
+    Com `hedge_delay=None` as fontes são tentadas uma após a outra (modo antigo).
+    Caso contrário cada fonte é disparada `hedge_delay` segundos depois da anterior
+    (ou imediatamente quando a anterior falha); o primeiro payload válido vence e
+    as demais requisições são canceladas.
+    """
+    if hedge_delay is None:
+        api_data = await get_fivem_players_api_async(server_id, deadline=deadline, session=session)
+        if api_data['success']:
+            return api_data
+        logger.info("API falhou, tentando web scraping")
+        return await get_fivem_players_async(server_id, session=session)
+
+    async def api_attempt(http, endpoint):
+        return await _fetch_api_endpoint(http, endpoint, server_id, API_TIMEOUT)
+
+    async def scrape_attempt(http):
+        return await get_fivem_players_async(server_id, session=http)
+
+    try:
+        async with asyncio.timeout(deadline):
+            async with _session_scope(session) as http:
+                attempts = [lambda e=endpoint: api_attempt(http, e) for endpoint in _api_endpoints(server_id)]
+                attempts.append(lambda: scrape_attempt(http))
+                result = await _race(attempts, hedge_delay)
+                if result['success']:
+                    return result
+                status = result['status']
+    except TimeoutError:
+        logger.error(f"Prazo total de {deadline}s esgotado para o servidor {server_id}")
+        status = None
+
+    return _failure(server_id, "Nenhuma fonte retornou dados (API bloqueada e scraping indisponível)", status)
+
+
+async def _race(attempts, hedge_delay):
+    """
+    Disparar as tentativas escalonadas e retornar o primeiro resultado válido.
+
+    Um payload da API sempre vence, mesmo sem jogadores (servidor vazio); um
+    scraping sem jogadores (página sem os dados) só é usado se nada melhor chegar.
+    Se todas falharem, retorna a falha mais relevante: bloqueio/limite de taxa
+    (403/429/5xx, que fazem o poller recuar) antes de qualquer outro status.
+    """
+    queue = list(attempts)
+    pending = set()
+    fallback = None
+    failure = {"success": False, "status": None}
+    try:
+        while queue or pending:
+            if queue:
+                pending.add(asyncio.create_task(queue.pop(0)()))
+            done, pending = await asyncio.wait(
+                pending,
+                timeout=hedge_delay if queue else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                result = task.result()
+                if not result['success']:
+                    if _failure_rank(result['status']) >= _failure_rank(failure['status']):
+                        failure = result
+                    continue
+                if result['players'] or result.get('source') == "api":
+                    return result
+                fallback = fallback or result
+        return fallback or failure
+    finally:
+        # Cancelar as fontes perdedoras
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+
+def _failure_rank(status):
+    return (is_throttled(status), status is not None)
+
+
+class _session_scope:
+    """Reusar a sessão recebida ou a sessão compartilhada (com pool de conexões)"""
+
+    def __init__(self, session):
+        self._session = session
+
+    async def __aenter__(self):
+        return self._session if self._session is not None else http_client.session()
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+
+async def _run_standalone(fn, *args):
+    """Executar uma coleta num event loop próprio e fechar a sessão compartilhada no fim"""
+    try:
+        return await fn(*args)
+    finally:
+        await http_client.close()
+
+
+def get_fivem_players(server_id):
+    """
+    Tentar obter dados do servidor FiveM via web scraping (versão síncrona).
+
+    Não chame de dentro de um event loop; use `get_fivem_players_async`.
+    """
+    return asyncio.run(_run_standalone(get_fivem_players_async, server_id))
+
 
 # Função alternativa usando API direta (mas que está com erro 403/404)
 def get_fivem_players_api(server_id):
     """
-    Tentar acessar a API direta do FiveM (provavelmente bloqueada)
-    """
-    # Tentar vários endpoints conhecidos
-    endpoints = [
-        f"https://servers-frontend.fivem.net/api/servers/single/{server_id}",
-        f"https://servers-live.fivem.net/api/servers/single/{server_id}",
-        f"https://servers-data.fivem.net/{server_id}"
-    ]
-    
-    for endpoint in endpoints:
-        try:
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-                'Accept': 'application/json',
-                'Origin': 'https://servers.fivem.net',
-                'Referer': 'https://servers.fivem.net/'
-            }
-            
-            logger.info(f"Tentando endpoint: {endpoint}")
-            response = requests.get(endpoint, headers=headers, timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                logger.info(f"Sucesso com endpoint: {endpoint}")
-                
-                if 'Data' in data and 'players' in data['Data']:
-                    return {
-                        "success": True,
-                        "message": "Dados obtidos via API",
-                        "hostname": data['Data'].get('hostname', f"FiveM Server {server_id}"),
-                        "players": data['Data']['players'],
-                        "max_players": data['Data'].get('svMaxclients', 0)
-                    }
-            else:
-                logger.warning(f"Falha no endpoint {endpoint}: {response.status_code}")
-        
-        except Exception as e:
-            logger.error(f"Erro no endpoint {endpoint}: {str(e)}")
-    
-    # Se chegarmos aqui, todos os endpoints falharam
-    return {
-        "success": False,
-        "message": "Todos os endpoints da API falharam (acesso bloqueado ou indisponível)",
-        "hostname": f"FiveM Server {server_id}",
-        "players": []
-    }
+    Tentar acessar a API direta do FiveM (versão síncrona).
+
+    Não chame de dentro de um event loop; use `get_fivem_players_api_async`.
+    """
+    return asyncio.run(_run_standalone(get_fivem_players_api_async, server_id))
+
 
 if __name__ == "__main__":
-    # Teste
+    # Teste: python fivem_scraper.py [server_id]
+    import sys
     logging.basicConfig(level=logging.INFO)
-    result = get_fivem_players("byzd3d")
-    print(json.dumps(result, indent=2))
\ No newline at end of file
+    result = get_fivem_players(sys.argv[1] if len(sys.argv) > 1 else "byzd3d")
+    print(json.dumps(result, indent=2, default=PlayerSnapshot.to_payload))
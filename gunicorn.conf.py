@@ -0,0 +1,9 @@
+# Configuração lida automaticamente pelo gunicorn (rodando na raiz do projeto)
+
+
+def post_worker_init(worker):
+    # O índice de jogadores registrados é relido em segundo plano quando o banco muda;
+    # cada worker tem a sua thread, iniciada aqui e não no import de `main`
+    from keep_alive import start_registry_refresher
+
+    start_registry_refresher()
@@ -0,0 +1,278 @@
+import asyncio
+import datetime
+import os
+import threading
+import time
+import logging
+from snapshot_diff import JOIN, LEAVE, RENAME, index_players
+from data_access import data_access
+
+logger = logging.getLogger(__name__)
+
+# Intervalo (s) entre as gravações em lote no banco
+HISTORY_FLUSH_INTERVAL = float(os.environ.get("HISTORY_FLUSH_INTERVAL", "30"))
+# Intervalo mínimo (s) entre duas amostras de população do mesmo servidor
+HISTORY_SAMPLE_INTERVAL = float(os.environ.get("HISTORY_SAMPLE_INTERVAL", "60"))
+# Máximo de itens na fila; com o banco fora do ar, os mais antigos são descartados
+HISTORY_MAX_PENDING = int(os.environ.get("HISTORY_MAX_PENDING", "50000"))
+
+_RECONCILE = "reconcile"
+_SAMPLE = "sample"
+
+
+def _utc(timestamp):
+    return datetime.datetime.utcfromtimestamp(timestamp)
+
+
+class HistoryRecorder:
+    """
+    Grava sessões de jogadores e a população dos servidores em lotes.
+
+    Eventos do SnapshotDiffer e amostras de população ficam numa fila em
+    memória; `flush()` grava tudo numa única transação com INSERT/UPDATE em
+    lote (executemany), na ordem em que os eventos aconteceram. O primeiro
+    snapshot de cada servidor reconcilia as sessões abertas no banco (ex.:
+    sessões que ficaram abertas quando o bot foi reiniciado).
+    """
+
+    def __init__(self, sample_interval=HISTORY_SAMPLE_INTERVAL, max_pending=HISTORY_MAX_PENDING):
+        self.sample_interval = sample_interval
+        self.max_pending = max_pending
+        self._pending = []
+        self._lock = threading.Lock()
+        self._seen = set()
+        self._last_sample = {}
+        self._task = None
+        self.rows_written = 0
+        self.flushes = 0
+        self.dropped = 0
+
+    def on_snapshot(self, server_id, data):
+        """Listener do cache: reconciliar no primeiro snapshot e amostrar a população"""
+        now = time.time()
+        if server_id not in self._seen:
+            self._seen.add(server_id)
+            self._queue(_RECONCILE, (server_id, index_players(data['players']), now))
+
+        if now - self._last_sample.get(server_id, 0) >= self.sample_interval:
+            self._last_sample[server_id] = now
+            self._queue(_SAMPLE, (server_id, len(data['players']), now))
+
+    def on_events(self, server_id, events, index):
+        """Assinante do SnapshotDiffer"""
+        for event in events:
+            self._queue(event.kind, event)
+
+    def _queue(self, kind, item):
+        with self._lock:
+            self._pending.append((kind, item))
+
+    def pending(self):
+        return len(self._pending)
+
+    def flush(self):
+        """Gravar tudo o que está na fila numa única transação (chamar fora do event loop)"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+
+        try:
+            with data_access.session_scope() as session:
+                written = 0
+                # Agrupar eventos consecutivos do mesmo tipo, mantendo a ordem entre grupos
+                batch_kind, batch = None, []
+                for kind, item in pending + [(None, None)]:
+                    if kind != batch_kind and batch:
+                        written += self._write_batch(session, batch_kind, batch)
+                        batch = []
+                    batch_kind = kind
+                    batch.append(item)
+        except Exception:
+            # Devolver à fila para tentar de novo no próximo flush, sem passar do limite
+            with self._lock:
+                self._pending = pending + self._pending
+                overflow = len(self._pending) - self.max_pending
+                if overflow > 0:
+                    dropped, self._pending = self._pending[:overflow], self._pending[overflow:]
+                    self.dropped += overflow
+            if overflow > 0:
+                # As sessões desses servidores ficaram incompletas: reconciliar no próximo snapshot
+                for kind, item in dropped:
+                    self._seen.discard(item[0] if kind in (_RECONCILE, _SAMPLE) else item.server_id)
+                logger.warning(f"Fila do histórico cheia: {overflow} eventos mais antigos descartados")
+            raise
+
+        self.rows_written += written
+        self.flushes += 1
+        return written
+
+    def _write_batch(self, session, kind, batch):
+        from models import db, PlayerSession, ServerPopulation, ServerPopulationHourly, dialect_insert
+
+        sessions = PlayerSession.__table__
+
+        if kind == JOIN:
+            session.execute(sessions.insert(), [
+                {"steam_id": e.player_key, "server_id": e.server_id, "name": e.name,
+                 "joined_at": _utc(e.at), "left_at": None}
+                for e in batch
+            ])
+            return len(batch)
+
+        if kind == LEAVE:
+            session.execute(
+                sessions.update()
+                .where(sessions.c.server_id == db.bindparam("b_server"),
+                       sessions.c.steam_id == db.bindparam("b_key"),
+                       sessions.c.left_at.is_(None))
+                .values(left_at=db.bindparam("b_left")),
+                [{"b_server": e.server_id, "b_key": e.player_key, "b_left": _utc(e.at)} for e in batch]
+            )
+            return len(batch)
+
+        if kind == RENAME:
+            session.execute(
+                sessions.update()
+                .where(sessions.c.server_id == db.bindparam("b_server"),
+                       sessions.c.steam_id == db.bindparam("b_key"),
+                       sessions.c.left_at.is_(None))
+                .values(name=db.bindparam("b_name")),
+                [{"b_server": e.server_id, "b_key": e.player_key, "b_name": e.name} for e in batch]
+            )
+            return len(batch)
+
+        if kind == _RECONCILE:
+            written = 0
+            for server_id, index, at in batch:
+                open_keys = set(session.scalars(
+                    db.select(sessions.c.steam_id)
+                    .where(sessions.c.server_id == server_id, sessions.c.left_at.is_(None))
+                ))
+                closed = open_keys - index.keys()
+                opened = index.keys() - open_keys
+                if closed:
+                    session.execute(
+                        sessions.update()
+                        .where(sessions.c.server_id == server_id,
+                               sessions.c.steam_id == db.bindparam("b_key"),
+                               sessions.c.left_at.is_(None))
+                        .values(left_at=_utc(at)),
+                        [{"b_key": key} for key in closed]
+                    )
+                if opened:
+                    session.execute(sessions.insert(), [
+                        {"steam_id": key, "server_id": server_id, "name": index[key],
+                         "joined_at": _utc(at), "left_at": None}
+                        for key in opened
+                    ])
+                written += len(closed) + len(opened)
+            return written
+
+        if kind == _SAMPLE:
+            session.execute(ServerPopulation.__table__.insert(), [
+                {"server_id": server_id, "sampled_at": _utc(at), "players": players}
+                for server_id, players, at in batch
+            ])
+
+            # Atualizar o agregado por hora com um único upsert por (servidor, hora)
+            hourly = {}
+            for server_id, players, at in batch:
+                hour = _utc(at).replace(minute=0, second=0, microsecond=0)
+                samples, total, peak = hourly.get((server_id, hour), (0, 0, 0))
+                hourly[(server_id, hour)] = (samples + 1, total + players, max(peak, players))
+
+            table = ServerPopulationHourly.__table__
+            for (server_id, hour), (samples, total, peak) in hourly.items():
+                stmt = dialect_insert(table, session).values(
+                    server_id=server_id, hour=hour, samples=samples,
+                    total_players=total, peak_players=peak
+                )
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[table.c.server_id, table.c.hour],
+                    set_={
+                        "samples": table.c.samples + stmt.excluded.samples,
+                        "total_players": table.c.total_players + stmt.excluded.total_players,
+                        "peak_players": db.case(
+                            (stmt.excluded.peak_players > table.c.peak_players, stmt.excluded.peak_players),
+                            else_=table.c.peak_players
+                        ),
+                    }
+                )
+                session.execute(stmt)
+            return len(batch) + len(hourly)
+
+        return 0
+
+    def start(self, interval=HISTORY_FLUSH_INTERVAL):
+        """Iniciar a gravação periódica no event loop atual (seguro chamar mais de uma vez)"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._run(interval))
+
+    async def _run(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                written = await data_access.run(self.flush)
+                if written:
+                    logger.info(f"Histórico gravado: {written} linhas")
+            except Exception as e:
+                logger.error(f"Erro ao gravar histórico: {str(e)}")
+
+
+def peak_hours(server_id, days=7):
+    """
+    Média e pico de jogadores por hora do dia (UTC) nos últimos `days` dias.
+
+    Lê só o agregado por hora (no máximo 24 * days linhas por servidor).
+    Retorna [(hora, média, pico)] ordenado da hora mais cheia para a mais vazia.
+    """
+    from models import db, ServerPopulationHourly
+
+    since = datetime.datetime.utcnow() - datetime.timedelta(days=days)
+    with data_access.session_scope() as session:
+        rows = session.execute(
+            db.select(ServerPopulationHourly.hour, ServerPopulationHourly.samples,
+                      ServerPopulationHourly.total_players, ServerPopulationHourly.peak_players)
+            .where(ServerPopulationHourly.server_id == server_id, ServerPopulationHourly.hour >= since)
+        ).all()
+
+    by_hour = {}
+    for hour, samples, total, peak in rows:
+        h_samples, h_total, h_peak = by_hour.get(hour.hour, (0, 0, 0))
+        by_hour[hour.hour] = (h_samples + samples, h_total + total, max(h_peak, peak))
+
+    result = [(hour, total / samples if samples else 0, peak) for hour, (samples, total, peak) in by_hour.items()]
+    result.sort(key=lambda row: row[1], reverse=True)
+    return result
+
+
+def time_played(steam_id, days=None, server_id=None):
+    """
+    Tempo total jogado (timedelta) e número de sessões de um jogador.
+
+    Usa o índice (steam_id, joined_at); sessões abertas contam até agora. Com
+    `days`, entram as sessões que passaram pela janela, contadas só a partir do início dela.
+    """
+    from models import db, PlayerSession
+
+    now = datetime.datetime.utcnow()
+    since = now - datetime.timedelta(days=days) if days else None
+    query = db.select(PlayerSession.joined_at, PlayerSession.left_at).where(PlayerSession.steam_id == steam_id)
+    if since is not None:
+        query = query.where(db.func.coalesce(PlayerSession.left_at, now) >= since)
+    if server_id:
+        query = query.where(PlayerSession.server_id == server_id)
+
+    with data_access.session_scope() as session:
+        rows = session.execute(query).all()
+
+    total = datetime.timedelta()
+    for joined_at, left_at in rows:
+        start = max(joined_at, since) if since is not None else joined_at
+        total += (left_at or now) - start
+    return total, len(rows)
+
+
+# Gravador compartilhado do processo
+history_recorder = HistoryRecorder()
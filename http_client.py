@@ -0,0 +1,169 @@
+import asyncio
+import importlib.util
+import os
+import threading
+import time
+import logging
+import weakref
+from collections import OrderedDict
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Conexões simultâneas por host (e no total) mantidas pelo pool
+HTTP_LIMIT_PER_HOST = int(os.environ.get("HTTP_LIMIT_PER_HOST", "8"))
+HTTP_LIMIT = int(os.environ.get("HTTP_LIMIT", "64"))
+# Tempo (s) que uma conexão ociosa fica aberta para ser reaproveitada
+HTTP_KEEPALIVE_TIMEOUT = float(os.environ.get("HTTP_KEEPALIVE_TIMEOUT", "60"))
+# Tempo (s) de cache das consultas DNS
+HTTP_DNS_TTL = int(os.environ.get("HTTP_DNS_TTL", "300"))
+# Respostas guardadas para requisições condicionais (ETag/Last-Modified)
+HTTP_CONDITIONAL_CACHE_SIZE = 256
+
+# O aiohttp descomprime "br" se o pacote brotli estiver instalado
+if importlib.util.find_spec("brotli") is not None:
+    ACCEPT_ENCODING = "gzip, deflate, br"
+else:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+
+class HttpClient:
+    """
+    Cliente HTTP compartilhado para todas as chamadas ao FiveM.
+
+    Uma `aiohttp.ClientSession` por event loop (o bot e coletas avulsas em
+    outras threads não compartilham sessão nem conexões), com pool de conexões por
+    host, keep-alive, cache de DNS e respostas comprimidas. `fetch()` pode
+    fazer requisições condicionais (If-None-Match / If-Modified-Since) e
+    reaproveitar o corpo guardado quando o servidor responde 304.
+
+    Estatísticas de conexões novas, reaproveitadas e tempo de conexão (TCP +
+    TLS) ficam em `stats()`.
+    """
+
+    def __init__(self, limit=HTTP_LIMIT, limit_per_host=HTTP_LIMIT_PER_HOST,
+                 keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT, dns_ttl=HTTP_DNS_TTL):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.dns_ttl = dns_ttl
+        # event loop -> sessão; some junto com o loop
+        self._sessions = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._validators = OrderedDict()
+        self.requests = 0
+        self.connections_created = 0
+        self.connections_reused = 0
+        self.connect_time = 0.0
+        self.dns_lookups = 0
+        self.dns_cache_hits = 0
+        self.not_modified = 0
+
+    def session(self):
+        """Sessão compartilhada do event loop atual (criada na primeira chamada)"""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_ttl,
+            )
+            session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"Accept-Encoding": ACCEPT_ENCODING},
+                trace_configs=[self._trace_config()],
+            )
+            with self._lock:
+                self._sessions[loop] = session
+        return session
+
+    async def close(self):
+        """Fechar a sessão do event loop atual (as de outros loops continuam abertas)"""
+        with self._lock:
+            session = self._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None and not session.closed:
+            await session.close()
+
+    async def fetch(self, url, headers=None, timeout=None, conditional=False, session=None):
+        """
+        GET completo; retorna (status, corpo em bytes).
+
+        Com `conditional=True`, envia os validadores da última resposta 200 e,
+        num 304, retorna (200, corpo guardado).
+        """
+        http = session or self.session()
+        headers = dict(headers or {})
+        cached = self._validators.get(url) if conditional else None
+        if cached is not None:
+            etag, last_modified, _ = cached
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        self.requests += 1
+        async with http.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            if response.status == 304 and cached is not None:
+                self.not_modified += 1
+                # A entrada pode ter sido descartada durante o await: gravar de novo
+                self._remember(url, cached)
+                return 200, cached[2]
+
+            body = await response.read()
+            if conditional and response.status == 200:
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
+                if etag or last_modified:
+                    self._remember(url, (etag, last_modified, body))
+            return response.status, body
+
+    def _remember(self, url, validators):
+        self._validators[url] = validators
+        self._validators.move_to_end(url)
+        while len(self._validators) > HTTP_CONDITIONAL_CACHE_SIZE:
+            self._validators.popitem(last=False)
+
+    def _trace_config(self):
+        trace = aiohttp.TraceConfig()
+
+        async def on_connection_create_start(session, context, params):
+            context.connect_started = time.perf_counter()
+
+        async def on_connection_create_end(session, context, params):
+            self.connections_created += 1
+            self.connect_time += time.perf_counter() - context.connect_started
+
+        async def on_connection_reuseconn(session, context, params):
+            self.connections_reused += 1
+
+        async def on_dns_resolvehost_end(session, context, params):
+            self.dns_lookups += 1
+
+        async def on_dns_cache_hit(session, context, params):
+            self.dns_cache_hits += 1
+
+        trace.on_connection_create_start.append(on_connection_create_start)
+        trace.on_connection_create_end.append(on_connection_create_end)
+        trace.on_connection_reuseconn.append(on_connection_reuseconn)
+        trace.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+        trace.on_dns_cache_hit.append(on_dns_cache_hit)
+        return trace
+
+    def stats(self):
+        """Contadores para confirmar que as conexões estão sendo reaproveitadas"""
+        return {
+            "requests": self.requests,
+            "connections_created": self.connections_created,
+            "connections_reused": self.connections_reused,
+            "avg_connect_ms": round(1000 * self.connect_time / self.connections_created, 1)
+            if self.connections_created else None,
+            "dns_lookups": self.dns_lookups,
+            "dns_cache_hits": self.dns_cache_hits,
+            "not_modified": self.not_modified,
+        }
+
+
+# Cliente compartilhado do processo
+http_client = HttpClient()
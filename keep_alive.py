@@ -1,42 +1,67 @@
-from flask import Flask, render_template, jsonify
+from flask import Blueprint, Flask, render_template, jsonify, request, Response, stream_with_context
 from threading import Thread
+import hmac
 import os
-import sys
+import time
 import logging
 
+from models import db
+from registry import registry, parse_player_rows, bulk_upsert_players, export_players
+from watchlist import normalize_server_id
+from shared_store import shared_store, STATUS_PUBLISH_INTERVAL
+import players_api
+import player_search
+
 # Set up logging
 logger = logging.getLogger(__name__)
 
-# Initialize Flask app
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET", "default-secret-key")
-
-# Configuração do banco de dados
-# Certifique-se de que DATABASE_URL existe, ou use um valor padrão para desenvolvimento
-database_url = os.environ.get("DATABASE_URL")
-if not database_url:
-    logger.warning("DATABASE_URL não configurado, usando SQLite para desenvolvimento")
-    database_url = "sqlite:///database.db"
-
-app.config["SQLALCHEMY_DATABASE_URI"] = database_url
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-
-# Importa e inicializa o banco de dados
-from models import db
+# Rotas do app; registradas em `create_app()`
+web = Blueprint("web", __name__)
+
+# Intervalo (s) entre as verificações de alterações no registro de jogadores (o bot pode estar em outro processo)
+REGISTRY_REFRESH_INTERVAL = float(os.environ.get("REGISTRY_REFRESH_INTERVAL", "30"))
+
+def create_app():
+    """Criar e configurar o app Flask, sem acessar o banco (as tabelas são criadas em `init_db`)"""
+    app = Flask(__name__)
+    app.secret_key = os.environ.get("SESSION_SECRET", "default-secret-key")
 
-# Inicializa o app com a extensão de banco de dados
-db.init_app(app)
+    # Configuração do banco de dados
+    # Certifique-se de que DATABASE_URL existe, ou use um valor padrão para desenvolvimento
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        logger.warning("DATABASE_URL não configurado, usando SQLite para desenvolvimento")
+        database_url = "sqlite:///database.db"
 
-# Cria todas as tabelas se não existirem
-with app.app_context():
-    db.create_all()
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_recycle": 300,
+        "pool_pre_ping": True,
+    }
+    app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+
+    # Inicializa o app com a extensão de banco de dados
+    db.init_app(app)
+    app.register_blueprint(web)
+    return app
+
+def init_db(app):
+    """Criar as tabelas que não existirem (feito pelo processo que executa o bot)"""
+    with app.app_context():
+        db.create_all()
+        player_search.ensure_search_index(db.engine)
     logger.info("Banco de dados inicializado")
 
-@app.route('/')
+_app = None
+
+def get_app():
+    """App compartilhado do processo (criado na primeira chamada)"""
+    global _app
+    if _app is None:
+        _app = create_app()
+    return _app
+
+@web.route('/')
 def home():
     """Render the home page"""
     # O token agora está fixo no código, então sempre mostramos como ativo
@@ -44,30 +69,159 @@ def home():
     # Bot sempre ativo, não precisa mais verificar variável de ambiente
     return render_template('index.html', has_token=has_token)
 
-@app.route('/health')
+@web.route('/health')
 def health():
     """Health check endpoint"""
     return {"status": "online"}
 
-@app.route('/api/status')
+@web.route('/api/status')
 def status():
     """API endpoint to check bot status"""
     has_token = bool(os.environ.get("DISCORD_TOKEN"))
     
-    # Check if bot_runner was imported, which means bot is running
-    bot_running = 'bot_runner' in sys.modules
+    # O bot (neste ou em outro processo) publica seu estado periodicamente no armazenamento compartilhado
+    bot_state, _, updated_at = shared_store.bot_state()
+    bot_running = updated_at is not None and time.time() - updated_at < 3 * STATUS_PUBLISH_INTERVAL
     
     return jsonify({
         "bot_status": "active" if has_token and bot_running else "setup_required",
         "web_server": "online",
         "token_configured": has_token,
-        "bot_thread_active": bot_running
+        "bot_thread_active": bot_running,
+        "bot_state_age": round(time.time() - updated_at, 1) if updated_at else None,
+        **(bot_state or {})
     })
 
+@web.route('/metrics')
+def metrics_endpoint():
+    """Métricas do bot no formato texto do Prometheus (última publicação do processo do bot)"""
+    _, metrics_text, _ = shared_store.bot_state()
+    return Response(metrics_text, mimetype="text/plain; version=0.0.4")
+
+def _registry_authorized():
+    """Importação/exportação exigem o token REGISTRY_API_TOKEN (desativadas se não configurado)"""
+    expected = os.environ.get("REGISTRY_API_TOKEN")
+    if not expected:
+        return False
+    return hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {expected}")
+
+@web.route('/api/registry/import', methods=['POST'])
+def registry_import():
+    """Importar jogadores em lote (CSV ou JSON, no corpo ou no campo de arquivo 'file')"""
+    if not _registry_authorized():
+        return jsonify({"error": "unauthorized"}), 401
+
+    upload = request.files.get('file')
+    if upload:
+        content, filename = upload.read(), upload.filename or ""
+    else:
+        content, filename = request.get_data(), "players.json" if request.is_json else "players.csv"
+
+    try:
+        rows, errors = parse_player_rows(content, filename)
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"error": f"Arquivo inválido: {str(e)}"}), 400
+
+    try:
+        imported = bulk_upsert_players(rows)
+    except Exception as e:
+        logger.error(f"Error importing players: {str(e)}")
+        return jsonify({"error": "Erro ao gravar jogadores"}), 500
+
+    return jsonify({"imported": imported, "errors": errors[:50], "error_count": len(errors)})
+
+@web.route('/api/registry/export')
+def registry_export():
+    """Exportar todos os jogadores registrados em streaming (?format=csv|json)"""
+    if not _registry_authorized():
+        return jsonify({"error": "unauthorized"}), 401
+
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'json'):
+        return jsonify({"error": "format deve ser csv ou json"}), 400
+
+    mimetype = "application/json" if fmt == "json" else "text/csv"
+    return Response(
+        stream_with_context(export_players(fmt)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=players.{fmt}"}
+    )
+
+def _page_args():
+    """(page, per_page) da query string, ou None se inválidos"""
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', players_api.DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return None
+    if page < 1 or not 1 <= per_page <= players_api.MAX_PAGE_SIZE:
+        return None
+    return page, per_page
+
+def _cached_json(rendered):
+    """Resposta com ETag forte (304 se o cliente já tem a versão) e gzip quando aceito"""
+    use_gzip = len(rendered.body) >= players_api.GZIP_MIN_SIZE and "gzip" in request.accept_encodings
+    # Cada codificação é uma representação diferente, com sua própria tag
+    tag = rendered.tag + ("-gz" if use_gzip else "")
+
+    if request.if_none_match.contains(tag):
+        response = Response(status=304)
+    elif use_gzip:
+        response = Response(rendered.gzipped, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+    else:
+        response = Response(rendered.body, mimetype="application/json")
+
+    response.set_etag(tag)
+    response.headers["Cache-Control"] = "no-cache"
+    response.vary.add("Accept-Encoding")
+    return response
+
+def start_registry_refresher():
+    """Manter o índice de jogadores registrados atualizado numa thread, fora das requisições"""
+    registry.start_refresher(REGISTRY_REFRESH_INTERVAL)
+
+@web.route('/api/servers/<server_id>/players')
+def server_players(server_id):
+    """Jogadores do último snapshot do servidor, com os dados do registro (?page=&per_page=)"""
+    server_id = normalize_server_id(server_id)
+    paging = _page_args()
+    if not server_id or paging is None:
+        return jsonify({"error": f"parâmetros inválidos (per_page até {players_api.MAX_PAGE_SIZE})"}), 400
+
+    rendered = players_api.server_players(server_id, *paging)
+    if rendered is None:
+        return jsonify({"error": "servidor sem snapshot (não está sendo acompanhado)"}), 404
+    return _cached_json(rendered)
+
+@web.route('/api/players/search')
+def search_players():
+    """Busca por prefixo/semelhança no nickname, grupo e notas (?q=&page=&per_page=)"""
+    query = request.args.get('q', '').strip()
+    try:
+        page = int(request.args.get('page', 1))
+        per_page = int(request.args.get('per_page', player_search.SEARCH_PAGE_SIZE))
+    except ValueError:
+        page = per_page = 0
+    if not query or page < 1 or not 1 <= per_page <= player_search.SEARCH_MAX_PAGE_SIZE:
+        return jsonify({"error": f"informe ?q= (per_page até {player_search.SEARCH_MAX_PAGE_SIZE})"}), 400
+
+    try:
+        return jsonify(player_search.search_players(query, page, per_page))
+    except Exception as e:
+        logger.error(f"Error searching players: {str(e)}")
+        return jsonify({"error": "erro na busca"}), 500
+
+@web.route('/api/players/<steam_id>')
+def player_status(steam_id):
+    """Dados registrados do jogador e servidores em que está online agora"""
+    return _cached_json(players_api.player_status(steam_id))
+
 def run():
     """Run the Flask app on the specified host and port"""
     try:
-        app.run(host='0.0.0.0', port=5000)
+        start_registry_refresher()
+        get_app().run(host='0.0.0.0', port=5000)
     except Exception as e:
         logger.error(f"Error starting Flask server: {str(e)}")
 
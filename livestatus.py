@@ -0,0 +1,285 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+import discord
+from data_access import data_access
+from factions import faction_rules
+from registry import registry
+from roster import render_roster
+from snapshot_cache import snapshot_cache
+
+logger = logging.getLogger(__name__)
+
+# Intervalo mínimo (s) entre edições no mesmo canal (o Discord limita edições por canal)
+LIVESTATUS_MIN_INTERVAL = float(os.environ.get("LIVESTATUS_MIN_INTERVAL", "15"))
+# Espera (s) para juntar snapshots que chegam quase ao mesmo tempo numa única rodada de edições
+LIVESTATUS_COALESCE = float(os.environ.get("LIVESTATUS_COALESCE", "2"))
+
+
+class LiveMessage:
+    """Roster ao vivo de um servidor num canal: mensagens publicadas e hash do conteúdo"""
+    __slots__ = ("guild_id", "channel_id", "server_id", "message_ids", "content_hash")
+
+    def __init__(self, guild_id, channel_id, server_id, message_ids=(), content_hash=None):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.server_id = server_id
+        self.message_ids = list(message_ids)
+        self.content_hash = content_hash
+
+
+def _split_ids(value):
+    return [int(i) for i in (value or "").split(",") if i]
+
+
+class LiveStatusStore:
+    """
+    Canais com roster ao vivo de cada servidor: server_id -> {channel_id: LiveMessage}.
+
+    Carregado uma vez do banco (LiveStatusMessage) e mantido por escrita direta;
+    os IDs das mensagens ficam no banco para um reinício editar as mesmas mensagens.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def load(self):
+        from models import db, LiveStatusMessage
+
+        with data_access.session_scope() as session:
+            rows = session.execute(db.select(
+                LiveStatusMessage.guild_id, LiveStatusMessage.channel_id, LiveStatusMessage.server_id,
+                LiveStatusMessage.message_ids, LiveStatusMessage.content_hash
+            )).all()
+
+        entries = {}
+        for guild_id, channel_id, server_id, message_ids, content_hash in rows:
+            entries.setdefault(server_id, {})[channel_id] = LiveMessage(
+                guild_id, channel_id, server_id, _split_ids(message_ids), content_hash
+            )
+        with self._lock:
+            self._entries = entries
+            self.loaded = True
+
+    def entries(self, server_id):
+        return list(self._entries.get(server_id, {}).values())
+
+    def servers(self):
+        return list(self._entries)
+
+    def subscribe(self, guild_id, channel_id, server_id):
+        """Ativar o roster ao vivo no canal; retorna False se já estava ativo"""
+        from models import db, LiveStatusMessage
+
+        with data_access.session_scope() as session:
+            exists = session.scalar(
+                db.select(LiveStatusMessage.id).filter_by(channel_id=channel_id, server_id=server_id)
+            )
+            if exists is None:
+                session.add(LiveStatusMessage(guild_id=guild_id, channel_id=channel_id, server_id=server_id))
+
+        with self._lock:
+            self._entries.setdefault(server_id, {}).setdefault(
+                channel_id, LiveMessage(guild_id, channel_id, server_id)
+            )
+        return exists is None
+
+    def unsubscribe(self, channel_id, server_id):
+        """Desativar o roster ao vivo do canal; retorna a entrada removida (ou None)"""
+        from models import db, LiveStatusMessage
+
+        with data_access.session_scope() as session:
+            session.execute(db.delete(LiveStatusMessage).filter_by(channel_id=channel_id, server_id=server_id))
+
+        with self._lock:
+            channels = self._entries.get(server_id)
+            entry = channels.pop(channel_id, None) if channels is not None else None
+            if channels is not None and not channels:
+                del self._entries[server_id]
+        return entry
+
+    def save_messages(self, entry, message_ids, content_hash):
+        """Gravar as mensagens publicadas e o hash do conteúdo"""
+        from models import db, LiveStatusMessage
+
+        with data_access.session_scope() as session:
+            session.execute(
+                db.update(LiveStatusMessage)
+                .filter_by(channel_id=entry.channel_id, server_id=entry.server_id)
+                .values(message_ids=",".join(map(str, message_ids)), content_hash=content_hash)
+            )
+        entry.message_ids = list(message_ids)
+        entry.content_hash = content_hash
+
+
+class LiveStatusUpdater:
+    """
+    Edita os rosters ao vivo quando chegam snapshots novos.
+
+    Cada snapshot só marca o servidor como pendente; uma única tarefa junta os
+    pendentes (`coalesce`), renderiza pelo cache de rosters e edita as
+    mensagens só se o conteúdo mudou. Um canal é editado no máximo uma vez a
+    cada `min_interval` segundos; o que chegar antes disso fica para depois,
+    já com o snapshot mais recente.
+    """
+
+    def __init__(self, store, min_interval=LIVESTATUS_MIN_INTERVAL, coalesce=LIVESTATUS_COALESCE):
+        self.store = store
+        self.min_interval = min_interval
+        self.coalesce = coalesce
+        self.client = None
+        self._pending = set()
+        self._wake = None
+        self._task = None
+        self._last_edit = {}
+        # Último roster renderizado de cada servidor e seu hash: server_id -> (mensagens, hash)
+        self._digests = {}
+        self.edits = 0
+        self.unchanged = 0
+        self.deferred = 0
+        self.errors = 0
+
+    def on_snapshot(self, server_id, data):
+        """Listener do cache de snapshots"""
+        if self.store.entries(server_id):
+            self.mark_dirty(server_id)
+
+    def mark_dirty(self, server_id):
+        self._pending.add(server_id)
+        if self._wake is not None:
+            self._wake.set()
+
+    def start(self, client):
+        """Iniciar a tarefa de edição no event loop atual (seguro chamar mais de uma vez)"""
+        self.client = client
+        if self._task is None or self._task.done():
+            self._wake = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+        # Conferir todos os rosters (após um reinício só edita o que mudou)
+        for server_id in self.store.servers():
+            self.mark_dirty(server_id)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._wake.wait()
+            await asyncio.sleep(self.coalesce)
+            self._wake.clear()
+            pending, self._pending = self._pending, set()
+            retry_in = None
+            for server_id in pending:
+                for entry in self.store.entries(server_id):
+                    wait = self._last_edit.get((entry.channel_id, server_id), float("-inf")) \
+                        + self.min_interval - time.monotonic()
+                    if wait > 0:
+                        # Editado há pouco: tentar de novo quando o intervalo passar
+                        self.deferred += 1
+                        self._pending.add(server_id)
+                        retry_in = wait if retry_in is None else min(retry_in, wait)
+                        continue
+                    try:
+                        await self._update(entry)
+                    except Exception as e:
+                        self.errors += 1
+                        logger.error(f"Erro ao atualizar o roster ao vivo do canal {entry.channel_id}: {str(e)}")
+            if retry_in is not None:
+                loop.call_later(retry_in, self._wake.set)
+
+    async def _render(self, entry, data):
+        """(mensagens, hash) do roster do servidor com as regras de facção da guild"""
+        classifier = faction_rules.cached(entry.guild_id)
+        if classifier is None:
+            classifier = await data_access.run(faction_rules.classifier, entry.guild_id)
+        batches = render_roster(entry.server_id, data, registry, classifier, faction_rules.version)
+        if not batches:
+            embed = discord.Embed(title=data['hostname'], color=discord.Color.blue())
+            embed.description = f"**0/{data.get('max_players', 0)}** players online"
+            batches = ((embed,),)
+
+        # O cache de rosters devolve o mesmo objeto enquanto nada muda: o hash é reaproveitado
+        cached = self._digests.get((entry.server_id, entry.guild_id))
+        if cached is not None and cached[0] is batches:
+            return cached
+        payload = json.dumps([[embed.to_dict() for embed in batch] for batch in batches], sort_keys=True)
+        rendered = (batches, hashlib.sha256(payload.encode("utf-8")).hexdigest())
+        self._digests[(entry.server_id, entry.guild_id)] = rendered
+        return rendered
+
+    async def _update(self, entry):
+        data = snapshot_cache.snapshot(entry.server_id)
+        channel = self.client.get_channel(entry.channel_id) if self.client else None
+        if data is None or channel is None:
+            return
+
+        batches, content_hash = await self._render(entry, data)
+        if content_hash == entry.content_hash and len(entry.message_ids) == len(batches):
+            self.unchanged += 1
+            return
+
+        # Toda tentativa conta para o intervalo mínimo do canal, mesmo se falhar
+        self._last_edit[(entry.channel_id, entry.server_id)] = time.monotonic()
+        # Mensagens do roster que existem no canal, na ordem; atualizada a cada passo
+        # que dá certo, para nunca perder o ID de uma mensagem já enviada
+        current = list(entry.message_ids)
+        complete = False
+        try:
+            kept = 0
+            for batch in batches[:len(current)]:
+                try:
+                    await channel.get_partial_message(current[kept]).edit(content=None, embeds=list(batch))
+                except discord.NotFound:
+                    del current[kept]
+                    break
+                kept += 1
+
+            # Apagar o que sobrou depois das mensagens editadas: o roster diminuiu, ou uma
+            # mensagem sumiu e o resto é republicado no fim do canal, mantendo a ordem
+            while len(current) > kept:
+                try:
+                    await channel.get_partial_message(current[-1]).delete()
+                except discord.NotFound:
+                    pass
+                current.pop()
+
+            for batch in batches[kept:]:
+                message = await channel.send(embeds=list(batch))
+                current.append(message.id)
+            complete = True
+            self.edits += 1
+        finally:
+            if complete or current != entry.message_ids:
+                # Sem o hash se parou no meio: a próxima rodada termina o trabalho
+                await data_access.run(
+                    self.store.save_messages, entry, current, content_hash if complete else None
+                )
+
+    async def remove_messages(self, entry):
+        """Apagar as mensagens de um roster ao vivo desativado"""
+        channel = self.client.get_channel(entry.channel_id) if self.client else None
+        if channel is None:
+            return
+        for message_id in entry.message_ids:
+            try:
+                await channel.get_partial_message(message_id).delete()
+            except discord.HTTPException:
+                pass
+
+    def stats(self):
+        return {
+            "channels": sum(len(self.store.entries(server_id)) for server_id in self.store.servers()),
+            "edits": self.edits,
+            "unchanged": self.unchanged,
+            "deferred": self.deferred,
+            "errors": self.errors,
+        }
+
+
+# Rosters ao vivo compartilhados do processo
+livestatus_store = LiveStatusStore()
+livestatus_updater = LiveStatusUpdater(livestatus_store)
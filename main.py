@@ -1,16 +1,32 @@
+import startup_profile  # Primeiro import: mede a inicialização desde o início
 import logging
-from keep_alive import app
-import bot_runner  # Imported to start the bot automatically
+import os
+
+with startup_profile.phase("import_web"):
+    from keep_alive import get_app
 
 # Set up logging
-logging.basicConfig(level=logging.DEBUG)
+# DEBUG só quando pedido: os logs de depuração custam caro nos caminhos quentes
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
+# "all": este processo também executa o bot (em uma thread); "web": só o servidor web,
+# com o bot rodando à parte em `python bot_runner.py`
+APP_ROLE = os.environ.get("APP_ROLE", "all")
+
 # For gunicorn to find the app instance
-# app is imported from keep_alive
+with startup_profile.phase("create_app"):
+    app = get_app()
+
+if APP_ROLE == "all":
+    # O bot (e a criação das tabelas) roda na própria thread; a web já pode atender
+    with startup_profile.phase("start_bot_thread"):
+        from bot_runner import start_bot_in_thread
+        bot_thread = start_bot_in_thread(app)
 
 # Log that the app is ready
 logger.info("FiveM Discord Bot web interface is ready")
+startup_profile.report()
 
 if __name__ == "__main__":
     logger.info("Starting FiveM Discord Bot in development mode")
@@ -20,7 +36,7 @@ if __name__ == "__main__":
     # Start the web server in a separate thread
     keep_alive()
     
-    # Bot is already running from bot_runner import
+    # Bot is already running in its own thread (APP_ROLE=all)
     # Just keep the main thread alive
     import time
     try:
@@ -0,0 +1,190 @@
+import asyncio
+import bisect
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Limites (s) dos buckets dos histogramas de latência
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Intervalo (s) entre as medições do atraso do event loop
+LOOP_LAG_INTERVAL = 1.0
+
+_metrics = []
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Contador que só aumenta"""
+    kind = "counter"
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = self._header()
+        # Copiar sob a trava: inc() roda também nas threads do executor
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(_Metric):
+    """Valor instantâneo; com `fn`, lido na hora da exportação"""
+    kind = "gauge"
+
+    def __init__(self, name, help, labels=(), fn=None):
+        super().__init__(name, help, labels)
+        self.fn = fn
+
+    def set(self, value, *label_values):
+        with self._lock:
+            self._values[label_values] = value
+
+    def render(self):
+        lines = self._header()
+        if self.fn is not None:
+            try:
+                value = self.fn()
+            except Exception as e:
+                logger.warning(f"Erro ao ler a métrica {self.name}: {str(e)}")
+                value = None
+            if value is not None:
+                lines.append(f"{self.name} {_format_value(value)}")
+            return lines
+        with self._lock:
+            items = sorted(self._values.items())
+        for values, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {_format_value(value)}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "started")
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.started, *self.label_values)
+
+
+class Histogram(_Metric):
+    """
+    Histograma com buckets fixos.
+
+    Cada observação é uma busca binária e um incremento; os buckets
+    cumulativos só são calculados na exportação.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(label_values)
+            if state is None:
+                state = self._values[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def time(self, *label_values):
+        """Context manager que mede o tempo do bloco"""
+        return _Timer(self, label_values)
+
+    def render(self):
+        lines = self._header()
+        with self._lock:
+            items = sorted((values, (list(counts), total)) for values, (counts, total) in self._values.items())
+        for values, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                labels = _format_labels(self.labels, values, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def render():
+    """Todas as métricas no formato texto do Prometheus"""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Métricas do bot
+STAGE_SECONDS = Histogram(
+    "fivem_bot_stage_seconds",
+    "Tempo de cada etapa (upstream_api, scrape, parse, snapshot_fetch, db, embed_build, discord_send)",
+    labels=("stage",)
+)
+COMMAND_SECONDS = Histogram("fivem_bot_command_seconds", "Tempo total de cada comando", labels=("command",))
+COMMANDS_TOTAL = Counter("fivem_bot_commands_total", "Comandos recebidos por resultado",
+                         labels=("command", "result"))
+UPSTREAM_REQUESTS_TOTAL = Counter("fivem_bot_upstream_requests_total",
+                                  "Requisições ao FiveM por endpoint e status", labels=("endpoint", "status"))
+LOOP_LAG_SECONDS = Histogram(
+    "fivem_bot_event_loop_lag_seconds", "Atraso do event loop do bot",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+GATEWAY_LATENCY = Gauge("fivem_bot_gateway_latency_seconds", "Latência do heartbeat do gateway do Discord")
+
+_loop_monitor = None
+
+
+def start_loop_monitor(interval=LOOP_LAG_INTERVAL):
+    """Medir o atraso do event loop atual em segundo plano (seguro chamar mais de uma vez)"""
+    global _loop_monitor
+    if _loop_monitor is None or _loop_monitor.done():
+        _loop_monitor = asyncio.ensure_future(_monitor_loop(interval))
+
+
+async def _monitor_loop(interval):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        LOOP_LAG_SECONDS.observe(max(0.0, time.perf_counter() - started - interval))
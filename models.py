@@ -23,4 +23,119 @@ class PlayerInfo(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
 
     def __repr__(self):
-        return f"<PlayerInfo {self.steam_id}: {self.nickname}>"
\ No newline at end of file
+        return f"<PlayerInfo {self.steam_id}: {self.nickname}>"
+
+
+class WatchedServer(db.Model):
+    """Servidores FiveM acompanhados por cada guild do Discord"""
+    __table_args__ = (db.UniqueConstraint('guild_id', 'server_id'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    guild_id = db.Column(db.BigInteger, nullable=False, index=True)
+    server_id = db.Column(db.String(32), nullable=False, index=True)
+    added_by = db.Column(db.String(200), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return f"<WatchedServer {self.guild_id}: {self.server_id}>"
+
+
+class FactionRule(db.Model):
+    """Regras de facção de cada guild (nome, cor, palavras-chave e ordem de exibição)"""
+    __table_args__ = (db.UniqueConstraint('guild_id', 'name'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    guild_id = db.Column(db.BigInteger, nullable=False, index=True)
+    name = db.Column(db.String(100), nullable=False)
+    # Palavras-chave separadas por vírgula, comparadas com o grupo registrado e o nome do jogador
+    keywords = db.Column(db.Text, nullable=False)
+    color = db.Column(db.Integer, nullable=False, default=0x696969)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return f"<FactionRule {self.guild_id}: {self.name}>"
+
+
+class NotificationChannel(db.Model):
+    """Canais que recebem avisos de entrada/saída de jogadores de um servidor FiveM"""
+    __table_args__ = (db.UniqueConstraint('channel_id', 'server_id'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    guild_id = db.Column(db.BigInteger, nullable=False, index=True)
+    channel_id = db.Column(db.BigInteger, nullable=False)
+    server_id = db.Column(db.String(32), nullable=False, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return f"<NotificationChannel {self.channel_id}: {self.server_id}>"
+
+
+class LiveStatusMessage(db.Model):
+    """Roster de um servidor FiveM mantido atualizado num canal, editando as mesmas mensagens"""
+    __table_args__ = (db.UniqueConstraint('channel_id', 'server_id'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    guild_id = db.Column(db.BigInteger, nullable=False, index=True)
+    channel_id = db.Column(db.BigInteger, nullable=False)
+    server_id = db.Column(db.String(32), nullable=False, index=True)
+    # IDs das mensagens do roster (até 10 embeds em cada), separados por vírgula
+    message_ids = db.Column(db.Text, nullable=False, default="")
+    # Hash do conteúdo publicado; a mensagem só é editada quando ele muda
+    content_hash = db.Column(db.String(64), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return f"<LiveStatusMessage {self.channel_id}: {self.server_id}>"
+
+
+class PlayerSession(db.Model):
+    """Sessões de jogo: quando cada jogador entrou e saiu de um servidor FiveM"""
+    __table_args__ = (
+        # "tempo jogado por steam:X" e sessões abertas por servidor
+        db.Index('ix_player_session_player', 'steam_id', 'joined_at'),
+        db.Index('ix_player_session_open', 'server_id', 'left_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Identificador estável do jogador (steam, senão outro identificador ou o nome)
+    steam_id = db.Column(db.String(120), nullable=False)
+    server_id = db.Column(db.String(32), nullable=False)
+    name = db.Column(db.String(200), nullable=True)
+    joined_at = db.Column(db.DateTime, nullable=False)
+    left_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<PlayerSession {self.server_id}: {self.steam_id} {self.joined_at}>"
+
+
+class ServerPopulation(db.Model):
+    """Amostras da quantidade de jogadores online de um servidor"""
+    __table_args__ = (db.Index('ix_server_population_time', 'server_id', 'sampled_at'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    server_id = db.Column(db.String(32), nullable=False)
+    sampled_at = db.Column(db.DateTime, nullable=False)
+    players = db.Column(db.Integer, nullable=False)
+
+
+class ServerPopulationHourly(db.Model):
+    """Agregado por hora das amostras de população (base das consultas de horário de pico)"""
+    __table_args__ = (db.UniqueConstraint('server_id', 'hour'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    server_id = db.Column(db.String(32), nullable=False)
+    hour = db.Column(db.DateTime, nullable=False)
+    samples = db.Column(db.Integer, nullable=False, default=0)
+    total_players = db.Column(db.Integer, nullable=False, default=0)
+    peak_players = db.Column(db.Integer, nullable=False, default=0)
+
+
+def dialect_insert(table, session):
+    """INSERT com suporte a ON CONFLICT do banco da sessão (Postgres ou SQLite)"""
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
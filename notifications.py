@@ -0,0 +1,110 @@
+import threading
+import logging
+from snapshot_diff import JOIN, LEAVE, RENAME
+from data_access import data_access
+
+logger = logging.getLogger(__name__)
+
+# Acima disso (ex.: reinício do servidor) só os totais são enviados
+MAX_LISTED_EVENTS = 30
+MESSAGE_LIMIT = 2000
+
+
+class NotificationStore:
+    """
+    Canais inscritos para receber eventos de cada servidor: server_id -> {channel_id}.
+
+    Carregado uma vez do banco (NotificationChannel) e mantido por escrita direta.
+    """
+
+    def __init__(self):
+        self._channels = {}
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def load(self):
+        from models import db, NotificationChannel
+
+        with data_access.session_scope() as session:
+            rows = session.execute(
+                db.select(NotificationChannel.server_id, NotificationChannel.channel_id)
+            ).all()
+
+        channels = {}
+        for server_id, channel_id in rows:
+            channels.setdefault(server_id, set()).add(channel_id)
+        with self._lock:
+            self._channels = channels
+            self.loaded = True
+
+    def channels(self, server_id):
+        return self._channels.get(server_id, set())
+
+    def servers(self):
+        return list(self._channels)
+
+    def subscribe(self, guild_id, channel_id, server_id):
+        """Inscrever o canal; retorna False se já estava inscrito"""
+        from models import db, NotificationChannel
+
+        with data_access.session_scope() as session:
+            exists = session.scalar(
+                db.select(NotificationChannel.id).filter_by(channel_id=channel_id, server_id=server_id)
+            )
+            if exists is None:
+                session.add(NotificationChannel(guild_id=guild_id, channel_id=channel_id, server_id=server_id))
+
+        with self._lock:
+            self._channels.setdefault(server_id, set()).add(channel_id)
+        return exists is None
+
+    def unsubscribe(self, channel_id, server_id):
+        """Cancelar a inscrição do canal; retorna False se não estava inscrito"""
+        from models import db, NotificationChannel
+
+        with data_access.session_scope() as session:
+            deleted = session.execute(
+                db.delete(NotificationChannel).filter_by(channel_id=channel_id, server_id=server_id)
+            ).rowcount
+
+        with self._lock:
+            channels = self._channels.get(server_id)
+            if channels is not None:
+                channels.discard(channel_id)
+                if not channels:
+                    del self._channels[server_id]
+        return deleted > 0
+
+
+def format_events(server_name, events, registry):
+    """Mensagens curtas (até 2000 caracteres cada) descrevendo os eventos de um snapshot"""
+    def display(event):
+        registered = registry.get(event.player_key)
+        return f"**{registered[0]}**" if registered else f"**{event.name}**"
+
+    joins = [e for e in events if e.kind == JOIN]
+    leaves = [e for e in events if e.kind == LEAVE]
+    renames = [e for e in events if e.kind == RENAME]
+
+    header = f"📡 **{server_name}**"
+    if len(events) > MAX_LISTED_EVENTS:
+        return [f"{header}: 🟢 {len(joins)} entraram, 🔴 {len(leaves)} saíram, ✏️ {len(renames)} trocaram de nome"]
+
+    lines = [f"🟢 {display(e)} entrou" for e in joins]
+    lines.extend(f"🔴 {display(e)} saiu" for e in leaves)
+    lines.extend(f"✏️ **{e.old_name}** agora é {display(e)}" for e in renames)
+
+    messages = []
+    current = header
+    for line in lines:
+        if len(current) + 1 + len(line) > MESSAGE_LIMIT:
+            messages.append(current)
+            current = line
+        else:
+            current += "\n" + line
+    messages.append(current)
+    return messages
+
+
+# Inscrições compartilhadas do processo
+notification_store = NotificationStore()
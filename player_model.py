@@ -0,0 +1,94 @@
+from operator import attrgetter
+
+
+class PlayerRecord:
+    """
+    Jogador normalizado uma única vez, no parse do payload do FiveM.
+
+    Os identificadores usados pelo bot (steam, license, discord) já vêm
+    separados, `sort_key` é o nome em minúsculas e `key` é o identificador
+    estável usado para comparar snapshots.
+    """
+    __slots__ = ("id", "name", "ping", "identifiers", "steam_id", "license", "discord", "key", "sort_key")
+
+    def __init__(self, id, name, ping, identifiers):
+        self.id = id
+        self.name = name
+        self.ping = ping
+        self.identifiers = identifiers
+        self.steam_id = ''
+        self.license = ''
+        self.discord = ''
+        for identifier in identifiers:
+            prefix = identifier.partition(':')[0]
+            if prefix == 'steam' and not self.steam_id:
+                self.steam_id = identifier
+            elif prefix == 'license' and not self.license:
+                self.license = identifier
+            elif prefix == 'discord' and not self.discord:
+                self.discord = identifier
+        # Identificador estável: steam, senão o primeiro identificador, senão o nome
+        self.key = self.steam_id or (identifiers[0] if identifiers else f"name:{name}")
+        self.sort_key = name.lower()
+
+    @classmethod
+    def from_payload(cls, raw):
+        """Criar a partir do dict do FiveM (ou None se o item não for um jogador)"""
+        if not isinstance(raw, dict):
+            return None
+        identifiers = tuple(i for i in raw.get('identifiers') or () if isinstance(i, str))
+        return cls(raw.get('id'), str(raw.get('name', 'Unknown')), raw.get('ping'), identifiers)
+
+    def to_payload(self):
+        return {"id": self.id, "name": self.name, "ping": self.ping, "identifiers": list(self.identifiers)}
+
+    def __repr__(self):
+        return f"<PlayerRecord {self.key} {self.name!r}>"
+
+
+class PlayerSnapshot:
+    """
+    Jogadores de um snapshot: registros ordenados por nome e índice por identificador.
+
+    Se comporta como uma sequência somente leitura (len, iteração, fatias) e
+    `get(identificador)` encontra o jogador por qualquer identificador.
+    """
+    __slots__ = ("players", "_by_identifier")
+
+    def __init__(self, players=()):
+        self.players = tuple(sorted(players, key=attrgetter("sort_key")))
+        by_identifier = {}
+        for player in self.players:
+            for identifier in player.identifiers:
+                by_identifier.setdefault(identifier, player)
+            by_identifier.setdefault(player.key, player)
+        self._by_identifier = by_identifier
+
+    @classmethod
+    def from_payload(cls, raw_players):
+        """Normalizar a lista de jogadores do FiveM (itens inválidos são descartados)"""
+        records = (PlayerRecord.from_payload(raw) for raw in raw_players or ())
+        return cls(record for record in records if record is not None)
+
+    def get(self, identifier):
+        return self._by_identifier.get(identifier)
+
+    def __contains__(self, identifier):
+        return identifier in self._by_identifier
+
+    def __len__(self):
+        return len(self.players)
+
+    def __iter__(self):
+        return iter(self.players)
+
+    def __getitem__(self, index):
+        return self.players[index]
+
+    def to_payload(self):
+        """Lista de dicts para serializar em JSON"""
+        return [player.to_payload() for player in self.players]
+
+
+# Snapshot vazio compartilhado (resultados de falha)
+EMPTY_SNAPSHOT = PlayerSnapshot()
@@ -0,0 +1,207 @@
+import os
+import time
+import logging
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from data_access import data_access
+
+logger = logging.getLogger(__name__)
+
+# Resultados por página da busca (padrão e máximo)
+SEARCH_PAGE_SIZE = int(os.environ.get("SEARCH_PAGE_SIZE", "10"))
+SEARCH_MAX_PAGE_SIZE = 50
+# Abaixo disso não há trigramas: a busca vira só prefixo do nickname
+TRIGRAM_MIN_LENGTH = 3
+# Depois de uma falha do índice de busca, quanto tempo (s) usar só LIKE antes de tentar de novo
+SEARCH_INDEX_RETRY = float(os.environ.get("SEARCH_INDEX_RETRY", "300"))
+
+# Momento (monotonic) da última falha do índice neste processo, ou None
+_index_failed_at = None
+
+# Postgres: índice de trigramas (pg_trgm) sobre nickname, grupo e notas, e prefixo do nickname
+_DOCUMENT = """lower(coalesce(nickname, '') || ' ' || coalesce("group", '') || ' ' || coalesce(notes, ''))"""
+_POSTGRES_SETUP = (
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    f"CREATE INDEX IF NOT EXISTS ix_player_info_search_trgm ON player_info USING gin (({_DOCUMENT}) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS ix_player_info_nickname_prefix ON player_info (lower(nickname) text_pattern_ops)",
+)
+
+# SQLite: tabela FTS5 (tokenizador trigram) com o conteúdo de player_info, mantida por triggers
+_SQLITE_SETUP = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS player_info_fts USING fts5(
+        nickname, "group", notes, content='player_info', content_rowid='id', tokenize='trigram'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS player_info_fts_ai AFTER INSERT ON player_info BEGIN
+        INSERT INTO player_info_fts (rowid, nickname, "group", notes)
+        VALUES (new.id, new.nickname, new."group", new.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS player_info_fts_ad AFTER DELETE ON player_info BEGIN
+        INSERT INTO player_info_fts (player_info_fts, rowid, nickname, "group", notes)
+        VALUES ('delete', old.id, old.nickname, old."group", old.notes);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS player_info_fts_au AFTER UPDATE ON player_info BEGIN
+        INSERT INTO player_info_fts (player_info_fts, rowid, nickname, "group", notes)
+        VALUES ('delete', old.id, old.nickname, old."group", old.notes);
+        INSERT INTO player_info_fts (rowid, nickname, "group", notes)
+        VALUES (new.id, new.nickname, new."group", new.notes);
+    END""",
+    "CREATE INDEX IF NOT EXISTS ix_player_info_nickname_nocase ON player_info (nickname COLLATE NOCASE)",
+)
+
+
+def ensure_search_index(engine):
+    """
+    Criar os índices de busca que não existirem (chamado junto com `create_all`).
+
+    O índice é opcional: sem permissão para `CREATE EXTENSION pg_trgm` ou sem o
+    tokenizador trigram do FTS5, só registra um aviso e a busca usa LIKE.
+    Retorna True se o índice está pronto.
+    """
+    global _index_failed_at
+
+    try:
+        with engine.begin() as conn:
+            if conn.dialect.name == "postgresql":
+                for statement in _POSTGRES_SETUP:
+                    conn.execute(text(statement))
+            elif conn.dialect.name == "sqlite":
+                created = conn.execute(text(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'player_info_fts'"
+                )).first() is None
+                for statement in _SQLITE_SETUP:
+                    conn.execute(text(statement))
+                if created:
+                    # Indexar os jogadores que já existiam antes da tabela FTS
+                    conn.execute(text("INSERT INTO player_info_fts (player_info_fts) VALUES ('rebuild')"))
+            else:
+                logger.warning(f"Busca de jogadores sem índice no banco {conn.dialect.name}; usando LIKE")
+                return False
+    except Exception as e:
+        logger.warning(f"Índice de busca de jogadores indisponível, usando LIKE: {str(e)}")
+        _index_failed_at = time.monotonic()
+        return False
+    _index_failed_at = None
+    logger.info("Índice de busca de jogadores pronto")
+    return True
+
+
+def _like_escape(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _trigrams(query):
+    """Trigramas das palavras da busca (palavras curtas não têm trigramas)"""
+    grams = []
+    for word in query.split():
+        for start in range(len(word) - TRIGRAM_MIN_LENGTH + 1):
+            gram = word[start:start + TRIGRAM_MIN_LENGTH]
+            if gram not in grams:
+                grams.append(gram)
+    return grams
+
+
+def _postgres_query(query, fuzzy):
+    # `LIKE` e `<%` (word_similarity acima do limite) usam o mesmo índice GIN de trigramas
+    if fuzzy:
+        return f"""
+            SELECT steam_id, nickname, "group", notes FROM player_info
+            WHERE {_DOCUMENT} LIKE :contains OR :query <% {_DOCUMENT}
+            ORDER BY (lower(nickname) LIKE :prefix) DESC, word_similarity(:query, {_DOCUMENT}) DESC, nickname
+            LIMIT :limit OFFSET :offset
+        """, {}
+    return """
+        SELECT steam_id, nickname, "group", notes FROM player_info
+        WHERE lower(nickname) LIKE :prefix ESCAPE '\\'
+        ORDER BY lower(nickname)
+        LIMIT :limit OFFSET :offset
+    """, {}
+
+
+def _sqlite_query(query, fuzzy):
+    if fuzzy:
+        # Qualquer trigrama da busca casa; bm25 ordena por quantos casaram (nickname pesa mais)
+        match = " OR ".join('"' + gram.replace('"', '""') + '"' for gram in _trigrams(query))
+        return """
+            SELECT p.steam_id, p.nickname, p."group", p.notes
+            FROM player_info_fts JOIN player_info AS p ON p.id = player_info_fts.rowid
+            WHERE player_info_fts MATCH :match
+            ORDER BY (p.nickname LIKE :prefix ESCAPE '\\') DESC, bm25(player_info_fts, 10.0, 5.0, 1.0), p.nickname
+            LIMIT :limit OFFSET :offset
+        """, {"match": match}
+    return """
+        SELECT steam_id, nickname, "group", notes FROM player_info
+        WHERE nickname LIKE :prefix ESCAPE '\\'
+        ORDER BY nickname COLLATE NOCASE
+        LIMIT :limit OFFSET :offset
+    """, {}
+
+
+def _like_query(query, fuzzy):
+    # Sem índice de busca: substring em nickname, grupo e notas (varre a tabela)
+    return """
+        SELECT steam_id, nickname, "group", notes FROM player_info
+        WHERE lower(nickname) LIKE :contains ESCAPE '\\'
+           OR lower(coalesce("group", '')) LIKE :contains ESCAPE '\\'
+           OR lower(coalesce(notes, '')) LIKE :contains ESCAPE '\\'
+        ORDER BY (lower(nickname) LIKE :prefix ESCAPE '\\') DESC, lower(nickname)
+        LIMIT :limit OFFSET :offset
+    """, {}
+
+
+def _query_builder(dialect):
+    """Consulta com o índice do banco, ou LIKE se não há índice (ou ele falhou há pouco)"""
+    if _index_failed_at is not None and time.monotonic() - _index_failed_at < SEARCH_INDEX_RETRY:
+        return _like_query
+    return {"postgresql": _postgres_query, "sqlite": _sqlite_query}.get(dialect, _like_query)
+
+
+def _fetch(query, fuzzy, params):
+    global _index_failed_at
+
+    build = _query_builder(data_access.engine.dialect.name)
+    sql, extra = build(query, fuzzy)
+    try:
+        with data_access.session_scope() as session:
+            return session.execute(text(sql), {**params, **extra}).all()
+    except DBAPIError as e:
+        if build is _like_query:
+            raise
+        # Índice ausente (extensão/tabela FTS não criada): cair para LIKE por um tempo
+        logger.warning(f"Índice de busca indisponível, usando LIKE: {str(e)}")
+        _index_failed_at = time.monotonic()
+    sql, extra = _like_query(query, fuzzy)
+    with data_access.session_scope() as session:
+        return session.execute(text(sql), {**params, **extra}).all()
+
+
+def search_players(query, page=1, per_page=SEARCH_PAGE_SIZE):
+    """
+    Buscar jogadores registrados por nickname, grupo e notas.
+
+    Casa por prefixo e por semelhança (trigramas, tolera erros de digitação):
+    pg_trgm no Postgres e FTS5 no SQLite (LIKE se o índice não existe). Nicknames que começam com a busca
+    vêm primeiro, depois os mais parecidos. Retorna a página pedida e se há mais.
+    """
+    query = " ".join(query.lower().split())
+    per_page = max(1, min(per_page, SEARCH_MAX_PAGE_SIZE))
+    result = {"query": query, "page": page, "per_page": per_page, "has_more": False, "results": []}
+    if not query:
+        return result
+
+    fuzzy = bool(_trigrams(query))
+    params = {
+        "query": query,
+        "prefix": _like_escape(query) + "%",
+        "contains": "%" + _like_escape(query) + "%",
+        # Uma linha a mais para saber se existe próxima página
+        "limit": per_page + 1,
+        "offset": (page - 1) * per_page,
+    }
+    rows = _fetch(query, fuzzy, params)
+
+    result["has_more"] = len(rows) > per_page
+    result["results"] = [
+        {"steam_id": steam_id, "nickname": nickname, "group": group, "notes": notes}
+        for steam_id, nickname, group, notes in rows[:per_page]
+    ]
+    return result
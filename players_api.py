@@ -0,0 +1,138 @@
+import gzip
+import json
+import threading
+from collections import OrderedDict
+import logging
+from shared_store import shared_store
+from registry import registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+# Respostas já serializadas mantidas em memória (por URL + versão)
+RENDER_CACHE_SIZE = 256
+# Corpos menores que isso não compensam a compressão
+GZIP_MIN_SIZE = 512
+
+
+class RenderedResponse:
+    """Corpo JSON serializado uma vez, com a versão gzip gerada na primeira vez que for pedida"""
+    __slots__ = ("tag", "body", "_gzipped")
+
+    def __init__(self, tag, body):
+        self.tag = tag
+        self.body = body
+        self._gzipped = None
+
+    @property
+    def gzipped(self):
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.body, compresslevel=6)
+        return self._gzipped
+
+
+class RenderCache:
+    """LRU de respostas prontas; a chave inclui as versões, então nunca fica desatualizado"""
+
+    def __init__(self, size=RENDER_CACHE_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.renders = 0
+
+    def get_or_render(self, key, tag, build):
+        with self._lock:
+            rendered = self._items.get(key)
+            if rendered is not None and rendered.tag == tag:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return rendered
+
+        rendered = RenderedResponse(tag, json.dumps(build(), ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            self.renders += 1
+            self._items[key] = rendered
+            self._items.move_to_end(key)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+        return rendered
+
+
+render_cache = RenderCache()
+
+def _player_entry(player):
+    """Jogador do snapshot com as informações do registro (índice em memória)"""
+    steam_id = player.steam_id
+    registered = registry.get(steam_id) if steam_id else None
+    return {
+        "id": player.id,
+        "name": player.name,
+        "ping": player.ping,
+        "steam_id": steam_id or None,
+        "registered": registered is not None,
+        "nickname": registered[0] if registered else None,
+        "group": registered[1] if registered else None,
+    }
+
+
+def server_players(server_id, page=1, per_page=DEFAULT_PAGE_SIZE):
+    """
+    Página de jogadores do último snapshot do servidor (ou None se não houver snapshot).
+
+    A tag muda quando chega um snapshot novo ou o registro de jogadores muda.
+    """
+    shared_store.refresh()
+    snapshot = shared_store.snapshot(server_id)
+    if snapshot is None:
+        return None
+    tag = f"s{snapshot['version']}.r{registry.digest:016x}.p{page}.{per_page}"
+
+    def build():
+        players = snapshot['players']
+        start = (page - 1) * per_page
+        return {
+            "server_id": server_id,
+            "hostname": snapshot['hostname'],
+            "max_players": snapshot['max_players'],
+            "fetched_at": snapshot['fetched_at'],
+            "total": len(players),
+            "page": page,
+            "per_page": per_page,
+            "pages": max(1, -(-len(players) // per_page)),
+            "players": [_player_entry(p) for p in players[start:start + per_page]],
+        }
+
+    return render_cache.get_or_render(("server", server_id, page, per_page), tag, build)
+
+
+def player_status(steam_id):
+    """Informações registradas do jogador e em quais servidores ele está online agora"""
+    shared_store.refresh()
+    tag = f"s{shared_store.version}.r{registry.digest:016x}"
+
+    def build():
+        registered = registry.get(steam_id)
+        online = []
+        for server_id in shared_store.server_ids():
+            snapshot = shared_store.snapshot(server_id)
+            player = snapshot['players'].get(steam_id) if snapshot else None
+            if player is not None:
+                online.append({
+                    "server_id": server_id,
+                    "hostname": snapshot['hostname'],
+                    "name": player.name,
+                    "id": player.id,
+                    "ping": player.ping,
+                    "fetched_at": snapshot['fetched_at'],
+                })
+        return {
+            "steam_id": steam_id,
+            "registered": registered is not None,
+            "nickname": registered[0] if registered else None,
+            "group": registered[1] if registered else None,
+            "online": online,
+        }
+
+    return render_cache.get_or_render(("player", steam_id), tag, build)
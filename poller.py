@@ -0,0 +1,151 @@
+import asyncio
+import os
+import random
+import time
+import logging
+from snapshot_cache import snapshot_cache
+from upstream import is_throttled
+
+logger = logging.getLogger(__name__)
+
+# Servidores monitorados em segundo plano: "id" ou "id:intervalo", separados por vírgula
+POLL_SERVERS = os.environ.get("POLL_SERVERS", "byzd3d")
+# Intervalo padrão entre coletas (s); deve ser menor que o SNAPSHOT_TTL para o cache ficar sempre quente
+POLL_INTERVAL = float(os.environ.get("POLL_INTERVAL", "20"))
+# Variação aleatória do intervalo (fração), para os servidores não baterem no FiveM ao mesmo tempo
+POLL_JITTER = float(os.environ.get("POLL_JITTER", "0.1"))
+# Intervalo máximo (s) quando o upstream está limitando o acesso
+POLL_MAX_BACKOFF = float(os.environ.get("POLL_MAX_BACKOFF", "600"))
+
+
+class PollState:
+    """Estado de coleta de um servidor"""
+    __slots__ = ("interval", "backoff", "last_poll", "last_status", "task")
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.backoff = 1
+        self.last_poll = None
+        self.last_status = None
+        self.task = None
+
+
+class ServerPoller:
+    """
+    Agendador que mantém os snapshots dos servidores sempre atualizados no cache.
+
+    Cada servidor é coletado no seu próprio intervalo (com jitter). Quando o
+    upstream responde 403/429/5xx o intervalo dobra até `max_backoff`, e volta
+    ao normal na primeira coleta bem-sucedida. As coletas passam pelo cache,
+    então compartilham a requisição com comandos que chegarem ao mesmo tempo.
+    """
+
+    def __init__(self, cache, interval=POLL_INTERVAL, jitter=POLL_JITTER, max_backoff=POLL_MAX_BACKOFF):
+        self.cache = cache
+        self.interval = interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self._servers = {}
+        self._running = False
+        # Servidores vindos da configuração (POLL_SERVERS), nunca removidos por comandos
+        self.configured = set()
+
+    def add_server(self, server_id, interval=None):
+        """Passar a monitorar um servidor (ou só ajustar o intervalo se já monitorado)"""
+        state = self._servers.get(server_id)
+        if state is None:
+            state = self._servers[server_id] = PollState(interval or self.interval)
+            if self._running:
+                state.task = asyncio.ensure_future(self._run(server_id, state))
+        elif interval:
+            state.interval = interval
+        return state
+
+    def remove_server(self, server_id):
+        state = self._servers.pop(server_id, None)
+        if state is not None and state.task is not None:
+            state.task.cancel()
+
+    def set_interval(self, server_id, interval):
+        """Alterar o intervalo de um servidor; vale a partir da próxima espera"""
+        self.add_server(server_id, interval)
+
+    def servers(self):
+        return list(self._servers)
+
+    def start(self):
+        """Iniciar as coletas no event loop atual (seguro chamar mais de uma vez)"""
+        if self._running:
+            return
+        self._running = True
+        for server_id, state in self._servers.items():
+            state.task = asyncio.ensure_future(self._run(server_id, state))
+        logger.info(f"Coleta em segundo plano iniciada para {len(self._servers)} servidor(es)")
+
+    def stop(self):
+        self._running = False
+        for state in self._servers.values():
+            if state.task is not None:
+                state.task.cancel()
+                state.task = None
+
+    async def _run(self, server_id, state):
+        while True:
+            try:
+                # shield: parar o poller não cancela uma busca compartilhada com comandos
+                await asyncio.shield(self.cache.refresh(server_id))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Erro na coleta do servidor {server_id}: {str(e)}")
+
+            state.last_poll = time.time()
+            error = self.cache.last_errors.get(server_id)
+            state.last_status = error.get('status') if error else 200
+            await asyncio.sleep(self._next_delay(server_id, state, error))
+
+    def _next_delay(self, server_id, state, error):
+        if error is None:
+            state.backoff = 1
+        elif is_throttled(error.get('status')):
+            state.backoff = min(state.backoff * 2, max(1, self.max_backoff / state.interval))
+            logger.warning(f"Upstream limitando o servidor {server_id} (Status: {error.get('status')}), "
+                           f"próxima coleta em {state.interval * state.backoff:.0f}s")
+
+        delay = min(state.interval * state.backoff, self.max_backoff)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def status(self):
+        """Estado das coletas e resumo do último snapshot de cada servidor"""
+        now = time.time()
+        result = {}
+        for server_id, state in list(self._servers.items()):
+            snapshot = self.cache.snapshot(server_id)
+            result[server_id] = {
+                "interval": state.interval,
+                "backoff": state.backoff,
+                "last_poll": state.last_poll,
+                "last_status": state.last_status,
+                "hostname": snapshot['hostname'] if snapshot else None,
+                "players": len(snapshot['players']) if snapshot else None,
+                "max_players": snapshot['max_players'] if snapshot else None,
+                "age": round(now - snapshot['fetched_at'], 1) if snapshot else None
+            }
+        return result
+
+
+def _configured_servers(spec):
+    """Interpretar POLL_SERVERS ("id" ou "id:intervalo", separados por vírgula)"""
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        server_id, _, interval = item.partition(":")
+        yield server_id.strip(), float(interval) if interval else None
+
+
+# Poller compartilhado do processo
+poller = ServerPoller(snapshot_cache)
+for _server_id, _interval in _configured_servers(POLL_SERVERS):
+    poller.add_server(_server_id, _interval)
+    poller.configured.add(_server_id)
@@ -0,0 +1,307 @@
+import csv
+import datetime
+import hashlib
+import io
+import json
+import threading
+import time
+import logging
+from data_access import data_access
+
+logger = logging.getLogger(__name__)
+
+
+class RegistryIndex:
+    """
+    Índice em memória dos jogadores registrados: steam_id -> (nickname, group).
+
+    O modelo PlayerInfo continua sendo a fonte da verdade; o índice é carregado
+    uma vez na inicialização e mantido atualizado por escrita direta (write-through)
+    a cada registro. `version` aumenta a cada alteração; `digest` é um hash do
+    conteúdo (igual em qualquer processo com os mesmos dados), usado nas ETags.
+    """
+
+    def __init__(self):
+        self._players = {}
+        self._lock = threading.Lock()
+        self._watermark = None
+        self._refresher = None
+        self.version = 0
+        self.digest = 0
+        self.loaded = False
+
+    def load(self):
+        """Carregar (ou recarregar) todo o índice a partir do banco de dados"""
+        from models import db, PlayerInfo
+
+        with data_access.session_scope() as session:
+            # Lida antes das linhas: uma alteração no meio é vista na próxima verificação
+            watermark = _watermark(session)
+            rows = session.execute(
+                db.select(PlayerInfo.steam_id, PlayerInfo.nickname, PlayerInfo.group)
+            ).all()
+
+        players = {steam_id: (nickname, group) for steam_id, nickname, group in rows}
+        digest = 0
+        for steam_id, entry in players.items():
+            digest ^= _entry_hash(steam_id, entry)
+        with self._lock:
+            # A versão só muda se o conteúdo mudou (recarregar não invalida caches à toa)
+            if digest != self.digest or not self.loaded:
+                self._players = players
+                self.digest = digest
+                self.version += 1
+            self.loaded = True
+            self._watermark = watermark
+        logger.info(f"Índice de jogadores registrados carregado: {len(players)} jogadores")
+
+    def ensure_loaded(self):
+        if not self.loaded:
+            self.load()
+
+    def refresh_if_changed(self):
+        """Recarregar se PlayerInfo mudou desde a última carga (quantidade ou último updated_at)"""
+        with data_access.session_scope() as session:
+            watermark = _watermark(session)
+        if not self.loaded or watermark != self._watermark:
+            self.load()
+
+    def start_refresher(self, interval):
+        """
+        Manter o índice atualizado numa thread própria (processos web sem o bot).
+
+        A cada `interval` segundos só a marca d'água do banco é consultada; a
+        tabela inteira só é relida quando ela muda. Até o processo do bot criar
+        as tabelas, só espera. Seguro chamar mais de uma vez.
+        """
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+
+        def run():
+            while True:
+                try:
+                    if self.loaded or _has_table():
+                        self.refresh_if_changed()
+                except Exception as e:
+                    logger.warning(f"Erro ao atualizar jogadores registrados: {str(e)}")
+                time.sleep(interval)
+
+        self._refresher = threading.Thread(target=run, name="registry-refresh", daemon=True)
+        self._refresher.start()
+
+    def get(self, steam_id):
+        """(nickname, group) do jogador, ou None se não registrado"""
+        return self._players.get(steam_id)
+
+    def __contains__(self, steam_id):
+        return steam_id in self._players
+
+    def __len__(self):
+        return len(self._players)
+
+    def put(self, steam_id, nickname, group):
+        """Atualizar o índice depois de gravar o jogador no banco"""
+        with self._lock:
+            self._set(steam_id, (nickname, group))
+            self.version += 1
+
+    def put_many(self, rows):
+        """Atualizar vários jogadores de uma vez (uma única alteração de versão)"""
+        with self._lock:
+            for row in rows:
+                self._set(row["steam_id"], (row["nickname"], row["group"]))
+            self.version += 1
+
+    def remove(self, steam_id):
+        with self._lock:
+            entry = self._players.pop(steam_id, None)
+            if entry is not None:
+                self.digest ^= _entry_hash(steam_id, entry)
+                self.version += 1
+
+    def _set(self, steam_id, entry):
+        # O digest é um XOR dos hashes das entradas: atualizado sem reler o índice
+        previous = self._players.get(steam_id)
+        if previous is not None:
+            self.digest ^= _entry_hash(steam_id, previous)
+        self._players[steam_id] = entry
+        self.digest ^= _entry_hash(steam_id, entry)
+
+
+def _entry_hash(steam_id, entry):
+    nickname, group = entry
+    value = f"{steam_id}\0{nickname}\0{group or ''}".encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), "big")
+
+
+def _has_table():
+    from sqlalchemy import inspect
+    from models import PlayerInfo
+
+    return inspect(data_access.engine).has_table(PlayerInfo.__tablename__)
+
+
+def _watermark(session):
+    """(quantidade, último updated_at) de PlayerInfo: muda a cada inclusão, alteração ou exclusão"""
+    from models import db, PlayerInfo
+
+    count, updated_at = session.execute(
+        db.select(db.func.count(PlayerInfo.id), db.func.max(PlayerInfo.updated_at))
+    ).one()
+    return count, updated_at
+
+
+# Índice compartilhado do processo
+registry = RegistryIndex()
+
+
+def get_player(steam_id):
+    """Dados registrados do jogador (dict) ou None"""
+    from models import db, PlayerInfo
+
+    with data_access.session_scope() as session:
+        player = session.scalars(db.select(PlayerInfo).filter_by(steam_id=steam_id)).first()
+        if player is None:
+            return None
+        return {
+            "steam_id": player.steam_id,
+            "nickname": player.nickname,
+            "notes": player.notes,
+            "group": player.group,
+            "updated_at": player.updated_at,
+        }
+
+
+def save_player(steam_id, nickname, notes, group):
+    """Registrar ou atualizar um jogador e o índice em memória; retorna True se é novo"""
+    from models import db, PlayerInfo
+
+    with data_access.session_scope() as session:
+        # Check if player exists
+        player = session.scalars(db.select(PlayerInfo).filter_by(steam_id=steam_id)).first()
+        created = player is None
+        if created:
+            player = PlayerInfo(steam_id=steam_id)
+            session.add(player)
+        player.nickname = nickname
+        player.notes = notes
+        player.group = group
+
+    registry.put(steam_id, nickname, group)
+    return created
+
+
+# Colunas aceitas na importação/exportação
+EXPORT_FIELDS = ("steam_id", "nickname", "group", "notes")
+# Linhas por comando INSERT ... ON CONFLICT (fica abaixo do limite de variáveis do SQLite)
+UPSERT_BATCH_SIZE = 500
+
+
+def parse_player_rows(content, filename=""):
+    """
+    Ler jogadores de um CSV (com cabeçalho) ou de uma lista JSON.
+
+    Campos: steam_id e nickname obrigatórios; group e notes opcionais. Sem
+    `group`, usa a primeira palavra das notas, como no comando register.
+    Retorna (linhas válidas, erros). Steam IDs repetidos ficam com a última linha.
+    """
+    if isinstance(content, bytes):
+        content = content.decode("utf-8-sig")
+
+    if filename.lower().endswith(".json") or content.lstrip().startswith(("[", "{")):
+        data = json.loads(content)
+        if isinstance(data, dict):
+            data = data.get("players", [])
+        records = data
+    else:
+        records = csv.DictReader(io.StringIO(content))
+
+    rows = {}
+    errors = []
+    for number, record in enumerate(records, start=1):
+        if not isinstance(record, dict):
+            errors.append(f"linha {number}: formato inválido")
+            continue
+        steam_id = str(record.get("steam_id") or "").strip()
+        nickname = str(record.get("nickname") or "").strip()
+        if not steam_id or not nickname:
+            errors.append(f"linha {number}: steam_id e nickname são obrigatórios")
+            continue
+        notes = str(record.get("notes") or "").strip()
+        group = str(record.get("group") or "").strip() or (notes.split()[0] if notes else None)
+        rows[steam_id] = {
+            "steam_id": steam_id[:120],
+            "nickname": nickname[:200],
+            "notes": notes,
+            "group": group[:100] if group else None,
+        }
+    return list(rows.values()), errors
+
+
+def bulk_upsert_players(rows):
+    """
+    Inserir ou atualizar vários jogadores numa única transação.
+
+    Usa INSERT ... ON CONFLICT (steam_id) DO UPDATE nativo do banco e depois
+    atualiza o índice em memória. Retorna a quantidade de linhas gravadas.
+    """
+    if not rows:
+        return 0
+
+    from models import PlayerInfo, dialect_insert
+
+    now = datetime.datetime.utcnow()
+    table = PlayerInfo.__table__
+    with data_access.session_scope() as session:
+        for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+            batch = [dict(row, created_at=now, updated_at=now) for row in rows[start:start + UPSERT_BATCH_SIZE]]
+            stmt = dialect_insert(table, session).values(batch)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.steam_id],
+                set_={
+                    "nickname": stmt.excluded.nickname,
+                    "notes": stmt.excluded.notes,
+                    "group": stmt.excluded.group,
+                    "updated_at": stmt.excluded.updated_at,
+                }
+            )
+            session.execute(stmt)
+
+    registry.put_many(rows)
+    logger.info(f"Importação em lote: {len(rows)} jogadores gravados")
+    return len(rows)
+
+
+def export_players(fmt="csv", batch_size=1000):
+    """
+    Gerar a exportação dos jogadores registrados em pedaços (CSV ou JSON).
+
+    Lê o banco em lotes com yield_per, sem carregar a tabela inteira na memória.
+    """
+    from models import db, PlayerInfo
+
+    columns = [getattr(PlayerInfo, field) for field in EXPORT_FIELDS]
+    with data_access.session_scope() as session:
+        result = session.execute(
+            db.select(*columns).order_by(PlayerInfo.id).execution_options(yield_per=batch_size)
+        )
+
+        if fmt == "json":
+            yield "["
+            first = True
+            for partition in result.partitions():
+                chunk = ",".join(json.dumps(dict(zip(EXPORT_FIELDS, row)), ensure_ascii=False) for row in partition)
+                yield ("" if first else ",") + chunk
+                first = False
+            yield "]"
+            return
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_FIELDS)
+        for partition in result.partitions():
+            writer.writerows(partition)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        yield buffer.getvalue()
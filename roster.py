@@ -0,0 +1,186 @@
+import os
+import logging
+from collections import OrderedDict
+from factions import DEFAULT_CLASSIFIER
+
+logger = logging.getLogger(__name__)
+
+# Limites do Discord
+FIELD_VALUE_LIMIT = 1024
+EMBED_FIELDS_LIMIT = 25
+# Vale para um embed e também para a soma de todos os embeds de uma mensagem
+EMBED_TOTAL_LIMIT = 6000
+EMBEDS_PER_MESSAGE = 10
+
+# Rosters renderizados guardados em memória (LRU)
+ROSTER_CACHE_SIZE = int(os.environ.get("ROSTER_CACHE_SIZE", "64"))
+
+
+def group_players(players, registry, classifier=DEFAULT_CLASSIFIER):
+    """
+    Classificar os jogadores do snapshot por facção, já com a linha formatada.
+
+    Cada jogador é classificado uma única vez, pelo grupo registrado e pelo
+    nome no jogo (nunca pelo texto formatado). Retorna {facção: [linhas]} na
+    ordem das regras, só com facções que têm jogadores. `players` é um
+    PlayerSnapshot, já ordenado por nome no parse.
+    """
+    groups = {faction: [] for faction in classifier.order}
+    for player in players:
+        player_name = player.name
+        steam_id = player.steam_id
+
+        # Usar informações do índice de jogadores registrados
+        registered = registry.get(steam_id)
+        if registered:
+            nickname, group = registered
+            player_info = f"• **{nickname}**"
+            if group:
+                player_info += f" ({group})"
+        else:
+            group = None
+            player_info = f"• **{player_name}** | Steam: `{steam_id}`"
+
+        groups[classifier.classify(group, player_name)].append(player_info)
+
+    return {faction: lines for faction, lines in groups.items() if lines}
+
+
+def chunk_lines(lines, limit=FIELD_VALUE_LIMIT):
+    """Agrupar linhas em blocos de até `limit` caracteres (unidas por quebra de linha)"""
+    chunks = []
+    current_chunk = []
+    current_length = 0
+
+    for line in lines:
+        if len(line) > limit:
+            line = line[:limit - 1] + "…"
+        # +1 pela quebra de linha entre as linhas do bloco
+        if current_chunk and current_length + 1 + len(line) > limit:
+            chunks.append(current_chunk)
+            current_chunk = []
+            current_length = 0
+        current_length += len(line) + (1 if current_chunk else 0)
+        current_chunk.append(line)
+
+    if current_chunk:
+        chunks.append(current_chunk)
+    return chunks
+
+
+def build_roster_embeds(server_name, players, max_players, registry, classifier=DEFAULT_CLASSIFIER):
+    """
+    Criar os embeds do roster: um por facção, com um campo por bloco de jogadores.
+
+    Uma facção só ganha um embed "(Cont.)" quando o embed atual chega ao limite
+    de campos ou de caracteres do Discord.
+    """
+    # discord.py é pesado; o servidor web importa este módulo sem precisar dele
+    import discord
+
+    players_count = len(players)
+    embeds = []
+
+    for faction, lines in group_players(players, registry, classifier).items():
+        color = classifier.colors[faction]
+        field_name = f"👥 {faction.upper()} Players"
+        new_embed = discord.Embed(
+            title=f"{server_name} - {faction.upper()}",
+            color=color
+        )
+        new_embed.description = f"**{players_count}/{max_players}** players online"
+        embeds.append(new_embed)
+
+        for chunk in chunk_lines(lines):
+            value = '\n'.join(chunk)
+            if new_embed.fields and (
+                len(new_embed.fields) >= EMBED_FIELDS_LIMIT
+                or len(new_embed) + len(field_name) + len(value) > EMBED_TOTAL_LIMIT
+            ):
+                # Se precisar de mais de um embed para a mesma facção
+                new_embed = discord.Embed(
+                    title=f"{server_name} - {faction.upper()} (Cont.)",
+                    color=color
+                )
+                embeds.append(new_embed)
+            new_embed.add_field(name=field_name, value=value, inline=False)
+
+    return embeds
+
+
+def pack_embeds(embeds):
+    """
+    Agrupar os embeds em mensagens de até 10 embeds e 6000 caracteres no total,
+    mantendo a ordem, para enviar tudo com o menor número de requisições.
+    """
+    messages = []
+    current = []
+    current_length = 0
+
+    for embed in embeds:
+        length = len(embed)
+        if current and (len(current) >= EMBEDS_PER_MESSAGE or current_length + length > EMBED_TOTAL_LIMIT):
+            messages.append(current)
+            current = []
+            current_length = 0
+        current.append(embed)
+        current_length += length
+
+    if current:
+        messages.append(current)
+    return messages
+
+
+class RosterCache:
+    """
+    Rosters já renderizados (mensagens de embeds prontas para enviar), em LRU.
+
+    A chave inclui o servidor e as versões do snapshot, do registro e das
+    regras de facção, então uma entrada nunca fica desatualizada: quando algo
+    muda, a chave muda e a entrada antiga sai pelo LRU. Guilds com as mesmas
+    regras compartilham as entradas. Os embeds guardados não devem ser alterados.
+    """
+
+    def __init__(self, size=ROSTER_CACHE_SIZE):
+        self.size = size
+        self._items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key, build):
+        """Mensagens em cache para `key`, ou `build()` (guardado com essa chave)"""
+        batches = self._items.get(key)
+        if batches is not None:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return batches
+        self.misses += 1
+        batches = tuple(tuple(batch) for batch in build())
+        self._items[key] = batches
+        while len(self._items) > self.size:
+            self._items.popitem(last=False)
+        return batches
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._items), "size": self.size}
+
+
+def render_roster(server_id, data, registry, classifier, factions_version):
+    """
+    Mensagens do roster de um snapshot do cache (lista de listas de embeds),
+    renderizadas só quando o snapshot, o registro ou as regras mudam.
+    """
+    def build():
+        return pack_embeds(build_roster_embeds(
+            data['hostname'], data['players'], data.get('max_players', 0), registry, classifier
+        ))
+
+    if data.get('version') is None:
+        # Dados que não vieram do cache de snapshots não têm versão para a chave
+        return build()
+    key = (server_id, data['version'], registry.version, factions_version, classifier.key)
+    return roster_cache.get_or_render(key, build)
+
+
+# Cache compartilhado por todas as guilds e canais
+roster_cache = RosterCache()
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from player_model import PlayerSnapshot
+
+logger = logging.getLogger(__name__)
+
+# Arquivo SQLite (modo WAL) compartilhado entre o processo do bot e os processos web
+SHARED_STORE_PATH = os.environ.get(
+    "SHARED_STORE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance", "shared_state.db")
+)
+# Intervalo (s) entre as publicações do estado do bot (status e métricas)
+STATUS_PUBLISH_INTERVAL = float(os.environ.get("STATUS_PUBLISH_INTERVAL", "5"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    server_id TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    fetched_at REAL NOT NULL,
+    hostname TEXT,
+    max_players INTEGER,
+    players TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_snapshots_version ON snapshots (version);
+CREATE TABLE IF NOT EXISTS bot_state (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    updated_at REAL NOT NULL,
+    status TEXT NOT NULL,
+    metrics TEXT NOT NULL
+);
+"""
+
+
+class SharedStore:
+    """
+    Estado do bot compartilhado com os processos web.
+
+    O processo do bot publica cada snapshot novo e, periodicamente, o status
+    e as métricas; as gravações rodam numa única thread própria. Os processos
+    web (quantos workers forem) leem do mesmo arquivo SQLite em modo WAL, sem
+    bloquear o escritor, e mantêm uma cópia em memória atualizada de forma
+    incremental pela coluna `version`.
+    """
+
+    def __init__(self, path=SHARED_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._executor = None
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._status_task = None
+        self.version = 0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # Lado do bot
+
+    def on_snapshot(self, server_id, data):
+        """Listener do cache: publicar o snapshot sem bloquear o event loop"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-store")
+        future = self._executor.submit(self.publish_snapshot, server_id, data, time.time())
+        future.add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(future):
+        if future.exception() is not None:
+            logger.error(f"Erro ao publicar no armazenamento compartilhado: {str(future.exception())}")
+
+    def publish_snapshot(self, server_id, data, fetched_at=None):
+        conn = self._connection()
+        players = json.dumps(data['players'].to_payload(), ensure_ascii=False)
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Versões crescentes mesmo entre reinícios do bot
+            (version,) = conn.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM snapshots").fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO snapshots (server_id, version, fetched_at, hostname, max_players, players) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (server_id, version, fetched_at or time.time(), data['hostname'],
+                 data.get('max_players', 0), players)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def publish_status(self, status, metrics_text):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO bot_state (id, updated_at, status, metrics) VALUES (1, ?, ?, ?)",
+            (time.time(), json.dumps(status, default=str), metrics_text)
+        )
+
+    def start_status_publisher(self, status_fn, metrics_fn, interval=STATUS_PUBLISH_INTERVAL):
+        """Publicar status e métricas a cada `interval` segundos (seguro chamar mais de uma vez)"""
+        if self._status_task is None or self._status_task.done():
+            self._status_task = asyncio.ensure_future(self._publish_status_loop(status_fn, metrics_fn, interval))
+
+    async def _publish_status_loop(self, status_fn, metrics_fn, interval):
+        loop = asyncio.get_running_loop()
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shared-store")
+        while True:
+            try:
+                await loop.run_in_executor(self._executor, self.publish_status, status_fn(), metrics_fn())
+            except Exception as e:
+                logger.error(f"Erro ao publicar o status do bot: {str(e)}")
+            await asyncio.sleep(interval)
+
+    # Lado web
+
+    def refresh(self):
+        """Trazer para a memória os snapshots publicados desde a última leitura"""
+        conn = self._connection()
+        (latest,) = conn.execute("SELECT COALESCE(MAX(version), 0) FROM snapshots").fetchone()
+        if latest <= self.version:
+            if latest < self.version:
+                # Arquivo recriado: recarregar tudo
+                with self._lock:
+                    self._snapshots, self.version = {}, 0
+                return self.refresh()
+            return
+        with self._lock:
+            rows = conn.execute(
+                "SELECT server_id, version, fetched_at, hostname, max_players, players "
+                "FROM snapshots WHERE version > ?", (self.version,)
+            ).fetchall()
+            snapshots = dict(self._snapshots)
+            for server_id, version, fetched_at, hostname, max_players, players in rows:
+                snapshots[server_id] = {
+                    "server_id": server_id,
+                    "hostname": hostname,
+                    "players": PlayerSnapshot.from_payload(json.loads(players)),
+                    "max_players": max_players,
+                    "fetched_at": fetched_at,
+                    "version": version
+                }
+            self._snapshots = snapshots
+            self.version = max(self.version, latest)
+
+    def snapshot(self, server_id):
+        """Último snapshot lido do servidor (ou None); chamar `refresh()` antes"""
+        return self._snapshots.get(server_id)
+
+    def server_ids(self):
+        return list(self._snapshots)
+
+    def bot_state(self):
+        """(status, métricas, updated_at) publicados pelo bot, ou (None, '', None)"""
+        row = self._connection().execute("SELECT status, metrics, updated_at FROM bot_state WHERE id = 1").fetchone()
+        if row is None:
+            return None, "", None
+        return json.loads(row[0]), row[1], row[2]
+
+
+# Armazenamento compartilhado do processo
+shared_store = SharedStore()
@@ -0,0 +1,219 @@
+import asyncio
+import os
+import time
+import logging
+from fivem_scraper import get_fivem_server_data_async
+from metrics import STAGE_SECONDS
+from player_model import EMPTY_SNAPSHOT
+
+logger = logging.getLogger(__name__)
+
+# Tempo (s) em que um snapshot é considerado fresco
+SNAPSHOT_TTL = float(os.environ.get("SNAPSHOT_TTL", "30"))
+# Tempo extra (s) em que um snapshot velho ainda é servido enquanto é atualizado em segundo plano
+SNAPSHOT_STALE_TTL = float(os.environ.get("SNAPSHOT_STALE_TTL", "120"))
+# Máximo de buscas simultâneas no FiveM ao consultar vários servidores
+FETCH_CONCURRENCY = int(os.environ.get("FETCH_CONCURRENCY", "4"))
+
+
+class CacheEntry:
+    """Snapshot armazenado no cache, com o momento da coleta e a versão"""
+    __slots__ = ("data", "fetched_at", "monotonic", "version")
+
+    def __init__(self, data, version=0):
+        self.data = data
+        self.version = version
+        self.fetched_at = time.time()
+        self.monotonic = time.monotonic()
+
+    def age(self):
+        return time.monotonic() - self.monotonic
+
+
+class SnapshotCache:
+    """
+    Cache em memória dos dados de servidores FiveM, por server_id.
+
+    - Dentro do `ttl` o snapshot é servido direto da memória.
+    - Até `ttl + stale_ttl` o snapshot velho é servido e uma atualização é
+      disparada em segundo plano (stale-while-revalidate).
+    - Chamadas simultâneas para o mesmo servidor compartilham uma única
+      requisição em andamento (single-flight).
+
+    Só resultados bem-sucedidos são armazenados.
+    """
+
+    def __init__(self, fetcher, ttl=SNAPSHOT_TTL, stale_ttl=SNAPSHOT_STALE_TTL):
+        self.fetcher = fetcher
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = {}
+        self._inflight = {}
+        # Última falha de cada servidor (removida quando uma busca funciona)
+        self.last_errors = {}
+        # Funções chamadas com (server_id, dados) a cada snapshot novo
+        self._listeners = []
+        # Aumenta a cada snapshot novo de qualquer servidor
+        self.version = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.fetches = 0
+        self.fetch_errors = 0
+
+    async def get(self, server_id):
+        """Retornar os dados do servidor, buscando no upstream só quando necessário"""
+        entry = self._entries.get(server_id)
+        if entry is not None:
+            age = entry.age()
+            if age < self.ttl:
+                self.hits += 1
+                return entry.data
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self.refresh(server_id)
+                return entry.data
+
+        self.misses += 1
+        # shield: cancelar um chamador não cancela a busca compartilhada
+        return await asyncio.shield(self.refresh(server_id))
+
+    async def get_many(self, server_ids, limit=FETCH_CONCURRENCY):
+        """
+        Buscar vários servidores ao mesmo tempo, com no máximo `limit` buscas simultâneas.
+
+        Retorna {server_id: dados} na mesma ordem de `server_ids`.
+        """
+        semaphore = asyncio.Semaphore(limit)
+
+        async def fetch(server_id):
+            # Snapshots frescos não ocupam uma vaga do semáforo
+            entry = self._entries.get(server_id)
+            if entry is not None and entry.age() < self.ttl:
+                return await self.get(server_id)
+            async with semaphore:
+                return await self.get(server_id)
+
+        results = await asyncio.gather(*(fetch(server_id) for server_id in server_ids), return_exceptions=True)
+        snapshots = {}
+        for server_id, result in zip(server_ids, results):
+            if isinstance(result, Exception):
+                result = {
+                    "success": False,
+                    "message": f"Erro ao obter dados: {str(result)}",
+                    "hostname": f"FiveM Server {server_id}",
+                    "players": EMPTY_SNAPSHOT
+                }
+            snapshots[server_id] = result
+        return snapshots
+
+    def peek(self, server_id):
+        """Retornar a entrada atual (ou None) sem disparar nenhuma busca"""
+        return self._entries.get(server_id)
+
+    def snapshot(self, server_id):
+        """Último snapshot publicado do servidor (ou None), sem disparar nenhuma busca"""
+        entry = self._entries.get(server_id)
+        if entry is None:
+            return None
+        return {
+            "server_id": server_id,
+            "hostname": entry.data['hostname'],
+            "players": entry.data['players'],
+            "max_players": entry.data.get('max_players', 0),
+            "fetched_at": entry.fetched_at,
+            "version": entry.version
+        }
+
+    def server_ids(self):
+        """Servidores com snapshot no cache"""
+        return list(self._entries)
+
+    def put(self, server_id, data):
+        """Armazenar um snapshot obtido por outro caminho"""
+        if data.get('success'):
+            self._store(server_id, data)
+
+    def add_listener(self, callback):
+        """Registrar uma função chamada com (server_id, dados) a cada snapshot novo"""
+        if callback not in self._listeners:
+            self._listeners.append(callback)
+
+    def _store(self, server_id, data):
+        """Publicar o snapshot; retorna os dados com a versão, como ficam no cache"""
+        self.version += 1
+        # A versão acompanha os dados (chave dos caches de renderização)
+        data = dict(data, version=self.version)
+        self._entries[server_id] = CacheEntry(data, self.version)
+        self.last_errors.pop(server_id, None)
+        for callback in self._listeners:
+            try:
+                callback(server_id, data)
+            except Exception as e:
+                logger.error(f"Erro no listener do cache para o servidor {server_id}: {str(e)}")
+        return data
+
+    def invalidate(self, server_id=None):
+        """Descartar um servidor (ou todos) do cache"""
+        if server_id is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(server_id, None)
+
+    def refresh(self, server_id):
+        """Iniciar (ou reaproveitar) a busca em andamento para o servidor; retorna a task"""
+        task = self._inflight.get(server_id)
+        if task is not None:
+            self.coalesced += 1
+            return task
+
+        task = asyncio.ensure_future(self._fetch(server_id))
+        self._inflight[server_id] = task
+        task.add_done_callback(lambda t: self._on_done(server_id, t))
+        return task
+
+    def _on_done(self, server_id, task):
+        self._inflight.pop(server_id, None)
+        # Consumir a exceção de atualizações em segundo plano que ninguém aguarda
+        if not task.cancelled():
+            task.exception()
+
+    async def _fetch(self, server_id):
+        self.fetches += 1
+        try:
+            with STAGE_SECONDS.time("snapshot_fetch"):
+                data = await self.fetcher(server_id)
+        except Exception as e:
+            logger.error(f"Erro ao atualizar o cache do servidor {server_id}: {str(e)}")
+            self.fetch_errors += 1
+            raise
+
+        if data.get('success'):
+            return self._store(server_id, data)
+
+        self.fetch_errors += 1
+        self.last_errors[server_id] = data
+        # Se a atualização falhar, continuar servindo o snapshot velho enquanto houver
+        entry = self._entries.get(server_id)
+        if entry is not None and entry.age() < self.ttl + self.stale_ttl:
+            return entry.data
+        return data
+
+    def stats(self):
+        """Contadores de uso do cache"""
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "fetches": self.fetches,
+            "fetch_errors": self.fetch_errors,
+            "entries": len(self._entries),
+            "ttl": self.ttl,
+            "stale_ttl": self.stale_ttl,
+        }
+
+
+# Cache compartilhado pelo bot e pelo servidor web
+snapshot_cache = SnapshotCache(get_fivem_server_data_async)
@@ -0,0 +1,104 @@
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+JOIN = "join"
+LEAVE = "leave"
+RENAME = "rename"
+
+
+class PlayerEvent:
+    """Entrada, saída ou troca de nome de um jogador entre dois snapshots"""
+    __slots__ = ("kind", "server_id", "player_key", "name", "old_name", "at")
+
+    def __init__(self, kind, server_id, player_key, name, old_name=None, at=None):
+        self.kind = kind
+        self.server_id = server_id
+        self.player_key = player_key
+        self.name = name
+        self.old_name = old_name
+        self.at = at or time.time()
+
+    def __repr__(self):
+        return f"<PlayerEvent {self.kind} {self.server_id}: {self.player_key} {self.name}>"
+
+
+def index_players(players):
+    """{identificador: nome} de um snapshot (a chave estável vem pronta do PlayerRecord)"""
+    return {p.key: p.name for p in players}
+
+
+def diff_indexes(server_id, previous, current, at=None):
+    """Eventos entre dois índices em O(n), com operações de conjunto sobre as chaves"""
+    at = at or time.time()
+    previous_keys = previous.keys()
+    current_keys = current.keys()
+
+    events = [PlayerEvent(JOIN, server_id, key, current[key], at=at) for key in current_keys - previous_keys]
+    events.extend(PlayerEvent(LEAVE, server_id, key, previous[key], at=at) for key in previous_keys - current_keys)
+    events.extend(
+        PlayerEvent(RENAME, server_id, key, current[key], previous[key], at=at)
+        for key in current_keys & previous_keys
+        if current[key] != previous[key]
+    )
+    return events
+
+
+class SnapshotDiffer:
+    """
+    Compara snapshots consecutivos de cada servidor e publica os eventos.
+
+    O primeiro snapshot de um servidor só serve de base (não gera eventos).
+    Assinantes recebem `(server_id, events, index)` e podem ser funções comuns
+    ou corrotinas (agendadas no event loop atual).
+    """
+
+    def __init__(self):
+        self._indexes = {}
+        self._subscribers = []
+        self.events_emitted = 0
+
+    def subscribe(self, callback):
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def current(self, server_id):
+        """Último índice {identificador: nome} conhecido do servidor (ou None)"""
+        return self._indexes.get(server_id)
+
+    def update(self, server_id, data, at=None):
+        """Registrar um novo snapshot bem-sucedido; retorna os eventos gerados"""
+        if not data.get('success'):
+            return []
+        index = index_players(data['players'])
+        previous = self._indexes.get(server_id)
+        self._indexes[server_id] = index
+        if previous is None:
+            return []
+
+        events = diff_indexes(server_id, previous, index, at)
+        if events:
+            self.events_emitted += len(events)
+            self._publish(server_id, events, index)
+        return events
+
+    def forget(self, server_id):
+        self._indexes.pop(server_id, None)
+
+    def _publish(self, server_id, events, index):
+        for callback in list(self._subscribers):
+            try:
+                result = callback(server_id, events, index)
+                if asyncio.iscoroutine(result):
+                    asyncio.ensure_future(result)
+            except Exception as e:
+                logger.error(f"Erro ao publicar eventos do servidor {server_id}: {str(e)}")
+
+
+# Comparador compartilhado do processo
+snapshot_differ = SnapshotDiffer()
@@ -0,0 +1,83 @@
+"""
+Perfil da inicialização: tempo de cada fase e, com STARTUP_PROFILE=1, de cada import.
+
+Importe este módulo antes de qualquer outro para medir a partir do início do processo.
+"""
+import builtins
+import os
+import sys
+import threading
+import time
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+STARTUP_PROFILE = os.environ.get("STARTUP_PROFILE", "0") == "1"
+# Quantos imports mais lentos aparecem no relatório
+TOP_IMPORTS = 20
+
+_started = time.perf_counter()
+_phases = []
+_imports = {}
+# Pilha por thread (o bot importa seus módulos na própria thread)
+_local = threading.local()
+_original_import = builtins.__import__
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    # Módulos já carregados não custam nada; só medir imports novos
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    stack = _local.__dict__.setdefault("stack", [])
+    stack.append(0.0)
+    started = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - started
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        total, own = _imports.get(name, (0.0, 0.0))
+        _imports[name] = (total + elapsed, own + elapsed - children)
+
+
+if STARTUP_PROFILE:
+    builtins.__import__ = _timed_import
+
+
+@contextmanager
+def phase(name):
+    """Medir uma fase da inicialização"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _phases.append((name, time.perf_counter() - started))
+
+
+def mark(name):
+    """Registrar um marco (ex.: bot pronto) com o tempo desde o início do processo"""
+    elapsed = time.perf_counter() - _started
+    _phases.append((name, elapsed))
+    logger.info(f"Inicialização: {name} após {1000 * elapsed:.0f} ms")
+
+
+def report():
+    """Registrar no log o tempo das fases e os imports mais lentos; retorna o relatório"""
+    result = {
+        "since_start_ms": round(1000 * (time.perf_counter() - _started), 1),
+        "phases": [(name, round(1000 * elapsed, 1)) for name, elapsed in _phases],
+        "imports": [
+            (name, round(1000 * total, 1), round(1000 * own, 1))
+            for name, (total, own) in sorted(_imports.items(), key=lambda item: item[1][1], reverse=True)[:TOP_IMPORTS]
+        ],
+    }
+    lines = [f"Inicialização concluída em {result['since_start_ms']:.0f} ms"]
+    lines += [f"  fase {name}: {ms:.0f} ms" for name, ms in result["phases"]]
+    if result["imports"]:
+        lines.append("  imports mais lentos (total / próprio):")
+        lines += [f"    {name}: {total:.0f} / {own:.0f} ms" for name, total, own in result["imports"]]
+    logger.info("\n".join(lines))
+    return result
@@ -0,0 +1,29 @@
+import asyncio
+
+from fivem_scraper import _race
+
+
+def _attempt(result, delay=0):
+    async def run():
+        await asyncio.sleep(delay)
+        return result
+    return run
+
+
+def _failure(status):
+    return {"success": False, "status": status}
+
+
+def test_race_prefers_throttling_status_over_404():
+    # API bloqueada num endpoint e servidor "não encontrado" no outro: o 403 deve prevalecer
+    for attempts in (
+        [_attempt(_failure(403)), _attempt(_failure(404), 0.01)],
+        [_attempt(_failure(404)), _attempt(_failure(403), 0.01)],
+    ):
+        result = asyncio.run(_race(attempts, hedge_delay=0))
+        assert result["status"] == 403
+
+
+def test_race_keeps_non_throttling_failure_over_no_status():
+    result = asyncio.run(_race([_attempt(_failure(None)), _attempt(_failure(404), 0.01)], hedge_delay=0))
+    assert result["status"] == 404
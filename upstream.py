@@ -0,0 +1,173 @@
+import asyncio
+import os
+import time
+import logging
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Falhas seguidas (403/5xx/tempo esgotado) que abrem o circuito de um endpoint
+BREAKER_THRESHOLD = int(os.environ.get("BREAKER_THRESHOLD", "3"))
+# Tempo (s) até a primeira sonda de um circuito aberto; dobra a cada sonda que falha
+BREAKER_RESET_TIMEOUT = float(os.environ.get("BREAKER_RESET_TIMEOUT", "60"))
+BREAKER_MAX_RESET_TIMEOUT = float(os.environ.get("BREAKER_MAX_RESET_TIMEOUT", "900"))
+# Limite de requisições por host: taxa (req/s) e rajada máxima
+UPSTREAM_RATE = float(os.environ.get("UPSTREAM_RATE", "2"))
+UPSTREAM_BURST = float(os.environ.get("UPSTREAM_BURST", "5"))
+
+# Respostas que indicam endpoint bloqueado (além dos 5xx). 404 não entra: as URLs
+# incluem o id do servidor, e um id inválido digitado num comando não diz nada
+# sobre o endpoint (nem pode desligá-lo para todos os servidores)
+TRIP_STATUSES = (403,)
+
+
+
+def is_throttled(status):
+    """403/429 (bloqueio/limite de taxa) e 5xx pedem para diminuir o ritmo"""
+    return status in (403, 429) or (status is not None and status >= 500)
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de um endpoint.
+
+    Depois de `threshold` falhas seguidas o circuito abre e as chamadas são
+    recusadas na hora. Passado `reset_timeout`, uma única requisição de sonda
+    é liberada (half-open): se funcionar o circuito fecha, se falhar abre de
+    novo com o dobro do tempo (até `max_reset_timeout`).
+    """
+
+    def __init__(self, name, threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT,
+                 max_reset_timeout=BREAKER_MAX_RESET_TIMEOUT):
+        self.name = name
+        self.threshold = threshold
+        self.base_reset_timeout = reset_timeout
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_status = None
+        self.rejected = 0
+        self._probing = False
+
+    def allow(self):
+        """Se uma requisição pode ser feita agora (no half-open, só a sonda)"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record(self, status, timed_out=False):
+        """Registrar o resultado de uma requisição liberada por `allow()`"""
+        probing, self._probing = self._probing, False
+        if timed_out or status in TRIP_STATUSES or (status is not None and status >= 500):
+            self.last_status = "timeout" if timed_out else status
+            self.failures += 1
+            if probing:
+                self.reset_timeout = min(self.reset_timeout * 2, self.max_reset_timeout)
+                self._open()
+            elif self.state == CLOSED and self.failures >= self.threshold:
+                self._open()
+        elif status is not None and status < 400:
+            self.last_status = status
+            if self.state != CLOSED:
+                logger.info(f"Circuito do endpoint {self.name} fechado")
+            self.state = CLOSED
+            self.failures = 0
+            self.reset_timeout = self.base_reset_timeout
+        # Outros resultados (404 e demais 4xx, erro de rede, cancelamento) não mudam o estado
+
+    def _open(self):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        logger.warning(f"Circuito do endpoint {self.name} aberto após {self.failures} falha(s) "
+                       f"(último: {self.last_status}); próxima sonda em {self.reset_timeout:.0f}s")
+
+    def status(self):
+        retry_in = None
+        if self.state == OPEN:
+            retry_in = round(max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at)), 1)
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "last_status": self.last_status,
+            "retry_in": retry_in,
+            "rejected": self.rejected,
+        }
+
+
+class TokenBucket:
+    """Limitador de taxa: `rate` fichas por segundo, acumulando até `burst`"""
+
+    def __init__(self, rate=UPSTREAM_RATE, burst=UPSTREAM_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.waited = 0.0
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        """Aguardar até haver uma ficha disponível e consumi-la"""
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            delay = (1 - self.tokens) / self.rate
+            self.waited += delay
+            await asyncio.sleep(delay)
+
+
+class UpstreamHealth:
+    """Circuit breakers por endpoint e limitadores de taxa por host"""
+
+    def __init__(self, rate=UPSTREAM_RATE, burst=UPSTREAM_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._breakers = {}
+        self._buckets = {}
+
+    def breaker(self, endpoint):
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            breaker = self._breakers[endpoint] = CircuitBreaker(endpoint)
+        return breaker
+
+    def bucket(self, host):
+        bucket = self._buckets.get(host)
+        if bucket is None:
+            bucket = self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    async def throttle(self, url):
+        """Respeitar o limite de taxa do host da URL"""
+        await self.bucket(urlsplit(url).hostname).acquire()
+
+    def status(self):
+        return {
+            "breakers": {name: breaker.status() for name, breaker in self._breakers.items()},
+            "limiters": {
+                host: {"tokens": round(bucket.tokens, 2), "waited": round(bucket.waited, 1)}
+                for host, bucket in self._buckets.items()
+            },
+        }
+
+
+# Estado compartilhado do processo
+upstream_health = UpstreamHealth()
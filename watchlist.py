@@ -0,0 +1,78 @@
+import re
+import logging
+from data_access import data_access
+
+logger = logging.getLogger(__name__)
+
+# Servidor usado quando nenhum for informado e a guild não tiver lista
+DEFAULT_SERVER_ID = "byzd3d"
+# Limite por guild (cada servidor vira um campo no embed do overview, que aceita 25)
+MAX_WATCHED_SERVERS = 25
+
+_SERVER_ID_RE = re.compile(r'^[a-z0-9]{3,32}$')
+
+
+def normalize_server_id(value):
+    """ID do servidor em minúsculas, ou None se não for um ID válido do cfx.re"""
+    value = (value or "").strip().lower()
+    # Aceitar também o link da página do servidor
+    value = value.rstrip("/").rsplit("/", 1)[-1]
+    return value if _SERVER_ID_RE.match(value) else None
+
+
+def list_watched(guild_id):
+    """IDs dos servidores acompanhados pela guild, na ordem em que foram adicionados"""
+    from models import db, WatchedServer
+
+    with data_access.session_scope() as session:
+        return list(session.scalars(
+            db.select(WatchedServer.server_id)
+            .filter_by(guild_id=guild_id)
+            .order_by(WatchedServer.id)
+        ))
+
+
+def all_watched_server_ids():
+    """Todos os servidores acompanhados por alguma guild"""
+    from models import db, WatchedServer
+
+    with data_access.session_scope() as session:
+        return list(session.scalars(db.select(WatchedServer.server_id).distinct()))
+
+
+def add_watched(guild_id, server_id, added_by=None):
+    """
+    Adicionar um servidor à lista da guild.
+
+    Retorna False se já estava na lista; levanta ValueError se a lista estiver cheia.
+    """
+    from models import db, WatchedServer
+
+    with data_access.session_scope() as session:
+        current = session.scalars(
+            db.select(WatchedServer.server_id).filter_by(guild_id=guild_id)
+        ).all()
+        if server_id in current:
+            return False
+        if len(current) >= MAX_WATCHED_SERVERS:
+            raise ValueError(f"A lista já tem o máximo de {MAX_WATCHED_SERVERS} servidores")
+        session.add(WatchedServer(guild_id=guild_id, server_id=server_id, added_by=added_by))
+        return True
+
+
+def remove_watched(guild_id, server_id):
+    """
+    Remover um servidor da lista da guild.
+
+    Retorna (removido, ainda_acompanhado_por_outra_guild).
+    """
+    from models import db, WatchedServer
+
+    with data_access.session_scope() as session:
+        deleted = session.execute(
+            db.delete(WatchedServer).filter_by(guild_id=guild_id, server_id=server_id)
+        ).rowcount
+        still_watched = session.scalar(
+            db.select(db.func.count()).select_from(WatchedServer).filter_by(server_id=server_id)
+        ) > 0
+        return deleted > 0, still_watched